@@ -0,0 +1,65 @@
+import numpy as np
+
+
+# Quaternions are (..., 4) arrays in PX4 order: w, x, y, z
+
+
+def _as_quat(q, dtype):
+    q = np.asarray(q, dtype=dtype)
+
+    if q.shape[-1] != 4:
+        raise ValueError(f"Expected (..., 4) quaternions, got shape {q.shape}")
+
+    return q
+
+
+def normalize_quaternions(q, dtype=np.float64):
+
+    q = _as_quat(q, dtype)
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+
+    # Zero quaternions (missing samples) become identity instead of NaN
+    identity = np.zeros_like(q)
+    identity[..., 0] = 1
+
+    return np.divide(q, norm, out=identity, where=norm > 0)
+
+
+def quaternion_multiply(a, b, dtype=np.float64):
+    """Hamilton product a ⊗ b, broadcast over leading dimensions."""
+
+    a = _as_quat(a, dtype)
+    b = _as_quat(b, dtype)
+
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=-1)
+
+
+def quaternion_to_euler(q, dtype=np.float64):
+    """
+    (..., 4) quaternions → (yaw, pitch, roll) arrays in degrees.
+    """
+
+    q = _as_quat(q, dtype)
+    q0, q1, q2, q3 = np.moveaxis(q, -1, 0)
+
+    sinr_cosp = 2 * (q0 * q1 + q2 * q3)
+    cosr_cosp = 1 - 2 * (q1 * q1 + q2 * q2)
+    roll = np.degrees(np.arctan2(sinr_cosp, cosr_cosp))
+
+    # Clip: rounding can push |sinp| just past 1 near ±90° pitch
+    sinp = 2 * (q0 * q2 - q3 * q1)
+    pitch = np.degrees(np.arcsin(np.clip(sinp, -1.0, 1.0)))
+
+    siny_cosp = 2 * (q0 * q3 + q1 * q2)
+    cosy_cosp = 1 - 2 * (q2 * q2 + q3 * q3)
+    yaw = np.degrees(np.arctan2(siny_cosp, cosy_cosp))
+
+    return yaw, pitch, roll
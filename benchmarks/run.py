@@ -0,0 +1,288 @@
+"""
+Pipeline benchmark suite.
+
+Generates a synthetic ULog + JPEG folder, then times each stage on its own:
+
+    extract_telemetry  ULog → merged telemetry DataFrame (no cache)
+    attitude_batched   quaternion → yaw/pitch/roll, one call for the whole log
+    attitude_per_row   the same through the old per-row iterrows loop (reference)
+    phase1_validate    EXIF header scan of every image
+    phase2_match       index + nearest match + interpolation
+    write_metadata     EXIF splice of every matched image
+
+Each stage runs once for timing, with memory tracing off, and once
+under tracemalloc for peak memory. Results go to a JSON file; --compare prints the ratio against
+an earlier result file.
+
+    python benchmarks/run.py --duration 1800 --images 500 --json out.json
+    python benchmarks/run.py --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from synthetic import write_ulog, write_images  # noqa: E402
+from ulog_reader import extract_streams, merge_streams  # noqa: E402
+from attitude import quaternion_to_euler  # noqa: E402
+from pipeline import validate_image, correct_time, MAX_ALLOWED_DIFF  # noqa: E402
+from matching import TelemetryIndex  # noqa: E402
+from interpolation import Trajectory  # noqa: E402
+from image_writer import write_metadata  # noqa: E402
+
+
+# ----------------------------------------
+# STAGES
+# ----------------------------------------
+
+def stage_extract(ctx):
+
+    # extract_telemetry(), keeping the raw streams for interpolation
+    ctx["streams"] = extract_streams(ctx["ulg"])
+    ctx["telemetry"] = merge_streams(*ctx["streams"][:2])
+
+    return {"items": len(ctx["telemetry"]), "bytes": ctx["ulg_bytes"]}
+
+
+def _euler_row(q0, q1, q2, q3):
+
+    # Scalar conversion as extract_telemetry did it before attitude.py
+    roll = np.degrees(np.arctan2(2 * (q0 * q1 + q2 * q3), 1 - 2 * (q1 * q1 + q2 * q2)))
+    pitch = np.degrees(np.arcsin(np.clip(2 * (q0 * q2 - q3 * q1), -1.0, 1.0)))
+    yaw = np.degrees(np.arctan2(2 * (q0 * q3 + q1 * q2), 1 - 2 * (q2 * q2 + q3 * q3)))
+
+    return yaw, pitch, roll
+
+
+def stage_attitude(ctx):
+
+    att_df = ctx["streams"][1]
+    q = att_df[["q0", "q1", "q2", "q3"]].to_numpy()
+
+    ctx["euler"] = np.column_stack(quaternion_to_euler(q))
+
+    return {"items": len(q), "bytes": 0}
+
+
+def stage_attitude_per_row(ctx):
+
+    att_df = ctx["streams"][1]
+    rows = []
+
+    for _, row in att_df.iterrows():
+        rows.append(_euler_row(row["q0"], row["q1"], row["q2"], row["q3"]))
+
+    # The batched kernel must stay a drop-in replacement
+    diff = np.abs(np.asarray(rows) - ctx["euler"]).max() if rows else 0.0
+    if diff > 1e-6:
+        raise ValueError(f"Batched attitude differs from per-row reference by {diff} deg")
+
+    return {"items": len(rows), "bytes": 0}
+
+
+def stage_validate(ctx):
+
+    folder = ctx["images"]
+    usec, names, corrected = [], [], []
+
+    for name in sorted(os.listdir(folder)):
+        image_time, problem = validate_image(os.path.join(folder, name))
+        if problem:
+            continue
+        stamp, text = correct_time(image_time, True)
+        usec.append(stamp)
+        names.append(name)
+        corrected.append(text)
+
+    ctx["usec"] = np.asarray(usec, dtype=np.int64)
+    ctx["names"] = names
+    ctx["corrected"] = corrected
+
+    return {"items": len(names), "bytes": ctx["image_bytes"]}
+
+
+def stage_match(ctx):
+
+    gps_df, att_df, _ = ctx["streams"]
+    index = TelemetryIndex(ctx["telemetry"])
+
+    idx, _, _, matched = index.match(ctx["usec"], MAX_ALLOWED_DIFF)
+    values = Trajectory(gps_df, att_df).sample(ctx["usec"][matched])
+
+    values["image"] = np.asarray(ctx["names"], dtype=object)[matched]
+    values["corrected_time"] = np.asarray(ctx["corrected"], dtype=object)[matched]
+    ctx["results"] = values
+
+    return {"items": int(matched.sum()), "bytes": 0}
+
+
+def stage_write(ctx):
+
+    out = ctx["output"]
+    shutil.rmtree(out, ignore_errors=True)
+
+    failures = write_metadata(
+        ctx["images"],
+        ctx["results"],
+        out,
+        workers=ctx["workers"]
+    )
+
+    written = sum(
+        entry.stat().st_size for entry in os.scandir(out) if entry.is_file()
+    )
+
+    return {"items": len(ctx["results"]["image"]) - len(failures), "bytes": written}
+
+
+STAGES = [
+    ("extract_telemetry", stage_extract),
+    ("attitude_batched", stage_attitude),
+    ("attitude_per_row", stage_attitude_per_row),
+    ("phase1_validate", stage_validate),
+    ("phase2_match", stage_match),
+    ("write_metadata", stage_write),
+]
+
+
+# ----------------------------------------
+# RUNNER
+# ----------------------------------------
+
+def measure(fn, ctx):
+
+    start = time.perf_counter()
+    counts = fn(ctx)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        fn(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        "seconds": round(seconds, 4),
+        "items": counts["items"],
+        "items_per_sec": round(counts["items"] / seconds, 1) if seconds else None,
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+    if counts["bytes"]:
+        result["mb"] = round(counts["bytes"] / 1e6, 2)
+        result["mb_per_sec"] = round(counts["bytes"] / 1e6 / seconds, 1)
+
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nvs {baseline_path} ({baseline.get('revision')})")
+
+    for name, stage in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old:
+            continue
+        speedup = old["seconds"] / stage["seconds"] if stage["seconds"] else float("inf")
+        print(
+            f"  {name:<20} {old['seconds']:>9.3f}s → {stage['seconds']:>9.3f}s "
+            f"({speedup:.2f}× faster), peak {old['peak_mb']} → {stage['peak_mb']} MB"
+        )
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="GeoTagger Pro benchmark suite")
+    parser.add_argument("--duration", type=float, default=600, help="ULog length (s)")
+    parser.add_argument("--gps-hz", type=float, default=5)
+    parser.add_argument("--att-hz", type=float, default=250)
+    parser.add_argument("--filler-hz", type=float, default=200,
+                        help="Rate of an unused topic (exercises topic filtering)")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--workdir", help="Keep generated data here")
+    parser.add_argument("--json", default="benchmark.json")
+    parser.add_argument("--compare", help="Earlier result JSON to compare with")
+    args = parser.parse_args(argv)
+
+    # Images every 2 s must fit inside the log
+    interval = min(2.0, max(args.duration - 10, 1) / max(args.images, 1))
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="geotagger_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    ctx = {
+        "ulg": os.path.join(workdir, "flight.ulg"),
+        "images": os.path.join(workdir, "images"),
+        "output": os.path.join(workdir, "output"),
+        "workers": args.workers,
+    }
+
+    print("Generating synthetic data...", flush=True)
+    shutil.rmtree(ctx["images"], ignore_errors=True)
+    ctx["ulg_bytes"] = write_ulog(
+        ctx["ulg"], args.duration, args.gps_hz, args.att_hz, args.filler_hz
+    )
+    ctx["image_bytes"] = write_images(
+        ctx["images"], args.images, args.width, args.height, interval
+    )
+
+    result = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "workdir")},
+        "stages": {},
+    }
+
+    for name, fn in STAGES:
+        print(f"Running {name}...", flush=True)
+        result["stages"][name] = measure(fn, ctx)
+
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(json.dumps(result["stages"], indent=2))
+
+    if args.compare:
+        compare(result, args.compare)
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+GUI startup benchmark.
+
+Launches main.py with GEOTAGGER_STARTUP_PROBE=1 several times; the app
+reports the time to its first shown window and which heavy modules were
+already imported, then quits. Fails if the median exceeds the budget
+or if a deferred module was loaded before the window appeared.
+
+    python benchmarks/startup.py [--runs 5] [--budget SEC]
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import STARTUP_BUDGET_SEC  # noqa: E402
+
+
+def probe_once():
+
+    env = dict(os.environ, GEOTAGGER_STARTUP_PROBE="1")
+    # Headless Linux CI
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py")],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    wall = time.perf_counter() - start
+
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            parts = line.split(" ")
+            heavy = parts[2].split(",") if len(parts) > 2 and parts[2] else []
+            return float(parts[1]), wall, heavy
+
+    raise RuntimeError(f"No STARTUP line from main.py:\n{proc.stdout}\n{proc.stderr}")
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SEC)
+    parser.add_argument("--json", help="Write results to this path")
+    args = parser.parse_args(argv)
+
+    # First launch warms the OS file cache; not counted
+    probe_once()
+
+    samples = [probe_once() for _ in range(args.runs)]
+
+    to_window = statistics.median(s[0] for s in samples)
+    wall = statistics.median(s[1] for s in samples)
+    heavy = sorted({m for s in samples for m in s[2]})
+
+    result = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        "time_to_window_sec": round(to_window, 4),
+        "process_wall_sec": round(wall, 4),
+        "budget_sec": args.budget,
+        "heavy_modules_loaded": heavy,
+        "passed": to_window <= args.budget and not heavy,
+    }
+
+    print(json.dumps(result, indent=2))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    return 0 if result["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
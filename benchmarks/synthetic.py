@@ -0,0 +1,234 @@
+"""
+Synthetic inputs for the benchmark suite.
+
+write_ulog()   → PX4 ULog with vehicle_gps_position, vehicle_attitude,
+                 optional camera_capture events and filler topics at
+                 configurable rates
+write_images() → folder of JPEGs with DateTimeOriginal inside the log's
+                 UTC window (one encoded frame, per-file EXIF spliced in)
+"""
+
+import os
+import sys
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_writer import build_app1_segment, find_exif_segment  # noqa: E402
+
+
+ULOG_MAGIC = b"ULog\x01\x12\x35"
+BOOT_OFFSET_USEC = 1_000_000
+
+# 2025-03-01 02:00:00 UTC
+DEFAULT_UTC_START = 1_740_794_400_000_000
+
+# Topic name → (format, field dtype)
+TOPICS = {
+    "vehicle_gps_position": (
+        "uint64_t timestamp;uint64_t time_utc_usec;double latitude_deg;"
+        "double longitude_deg;float altitude_msl_m;",
+        [("timestamp", "<u8"), ("time_utc_usec", "<u8"), ("latitude_deg", "<f8"),
+         ("longitude_deg", "<f8"), ("altitude_msl_m", "<f4")],
+    ),
+    "vehicle_attitude": (
+        "uint64_t timestamp;float[4] q;",
+        [("timestamp", "<u8"), ("q", "<f4", (4,))],
+    ),
+    "camera_capture": (
+        "uint64_t timestamp;uint64_t timestamp_utc;uint32_t seq;int8_t result;",
+        [("timestamp", "<u8"), ("timestamp_utc", "<u8"), ("seq", "<u4"),
+         ("result", "i1")],
+    ),
+    # Filler: parsed by an unfiltered ULog() but never used
+    "sensor_combined": (
+        "uint64_t timestamp;float[3] gyro_rad;float[3] accelerometer_m_s2;",
+        [("timestamp", "<u8"), ("gyro_rad", "<f4", (3,)),
+         ("accelerometer_m_s2", "<f4", (3,))],
+    ),
+}
+
+
+def _message(msg_type, payload):
+    return struct.pack("<HB", len(payload), ord(msg_type)) + payload
+
+
+def _records(name, msg_id, times, utc_start, ground_speed):
+
+    fmt, fields = TOPICS[name]
+    dtype = np.dtype(
+        [("size", "<u2"), ("type", "u1"), ("msg_id", "<u2")] + fields
+    )
+
+    rec = np.zeros(len(times), dtype=dtype)
+    rec["size"] = dtype.itemsize - 3
+    rec["type"] = ord("D")
+    rec["msg_id"] = msg_id
+    rec["timestamp"] = times
+
+    t = (times - BOOT_OFFSET_USEC) / 1e6
+
+    if name == "vehicle_gps_position":
+        # Straight line heading north-east at ground_speed m/s
+        step = ground_speed * t / 111_320.0
+        rec["time_utc_usec"] = utc_start + times - BOOT_OFFSET_USEC
+        rec["latitude_deg"] = 14.0 + step
+        rec["longitude_deg"] = 121.0 + step
+        rec["altitude_msl_m"] = 100 + 0.05 * t
+
+    elif name == "vehicle_attitude":
+        # Slow yaw rotation with a little roll/pitch wobble
+        half_yaw = np.radians(2.0 * t) / 2
+        half_roll = np.radians(3.0 * np.sin(t)) / 2
+        rec["q"] = np.stack([
+            np.cos(half_yaw) * np.cos(half_roll),
+            np.sin(half_roll) * np.cos(half_yaw),
+            np.sin(half_roll) * np.sin(half_yaw),
+            np.sin(half_yaw) * np.cos(half_roll),
+        ], axis=1)
+
+    elif name == "camera_capture":
+        rec["timestamp_utc"] = utc_start + times - BOOT_OFFSET_USEC
+        rec["seq"] = np.arange(len(times))
+        rec["result"] = 1
+
+    else:
+        rec["accelerometer_m_s2"][:, 2] = 9.81
+
+    return rec
+
+
+def write_ulog(
+    path,
+    duration=600,
+    gps_hz=5,
+    att_hz=250,
+    filler_hz=0,
+    utc_start=DEFAULT_UTC_START,
+    ground_speed=15.0,
+    triggers=0,
+    trigger_interval=2.0,
+    trigger_offset=5.0
+):
+    """
+    Write a synthetic ULog; returns its size in bytes.
+
+    triggers > 0 adds that many camera_capture events (seq 0, 1, ...)
+    at the instants write_images() uses for the same interval/offset.
+    """
+
+    topics = [("vehicle_gps_position", gps_hz), ("vehicle_attitude", att_hz)]
+    if filler_hz:
+        topics.append(("sensor_combined", filler_hz))
+    if triggers:
+        topics.append(("camera_capture", 0))
+
+    with open(path, "wb") as f:
+
+        f.write(ULOG_MAGIC + bytes([1]) + struct.pack("<Q", 0))
+        f.write(_message("B", bytes(16) + struct.pack("<QQQ", 0, 0, 0)))
+
+        for name, _ in topics:
+            f.write(_message("F", f"{name}:{TOPICS[name][0]}".encode()))
+
+        for msg_id, (name, _) in enumerate(topics):
+            f.write(_message("A", struct.pack("<BH", 0, msg_id) + name.encode()))
+
+        # Written one second at a time so data stays roughly chronological
+        for second in range(int(np.ceil(duration))):
+            for msg_id, (name, hz) in enumerate(topics):
+                if not hz:
+                    continue
+                start = int(np.ceil(second * hz))
+                stop = int(np.ceil(min(second + 1, duration) * hz))
+                times = BOOT_OFFSET_USEC + (
+                    np.arange(start, stop) * (1e6 / hz)
+                ).astype(np.uint64)
+                f.write(_records(name, msg_id, times, utc_start, ground_speed).tobytes())
+
+        if triggers:
+            times = BOOT_OFFSET_USEC + (
+                (trigger_offset + np.arange(triggers) * trigger_interval) * 1e6
+            ).astype(np.uint64)
+            f.write(
+                _records("camera_capture", len(topics) - 1, times, utc_start, ground_speed)
+                .tobytes()
+            )
+
+    return os.path.getsize(path)
+
+
+def write_images(
+    folder,
+    count=200,
+    width=1920,
+    height=1080,
+    interval=2.0,
+    utc_start=DEFAULT_UTC_START,
+    first_offset=5.0,
+    camera_utc_offset_hours=0,
+    quality=90
+):
+    """
+    Write `count` JPEGs captured every `interval` seconds.
+
+    DateTimeOriginal is the camera clock, UTC + camera_utc_offset_hours;
+    with the default 0 the pipeline's "+8 hour" setting (read as PHT)
+    lands inside the ULog window. Returns total bytes written.
+    """
+
+    import piexif
+    from PIL import Image
+
+    os.makedirs(folder, exist_ok=True)
+
+    # Noise compresses like a real photo, unlike a flat colour
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    template_path = os.path.join(folder, ".template.jpg")
+    Image.fromarray(pixels).save(template_path, quality=quality)
+
+    with open(template_path, "rb") as f:
+        template = f.read()
+    os.remove(template_path)
+
+    _, _, insert_at = find_exif_segment(template)
+    head, body = template[:insert_at], template[insert_at:]
+
+    # Camera clock = UTC + camera_utc_offset_hours (the host timezone plays no part)
+    base = (
+        datetime.fromtimestamp(utc_start / 1e6, tz=timezone.utc)
+        + timedelta(hours=camera_utc_offset_hours, seconds=first_offset)
+    ).replace(tzinfo=None)
+
+    total = 0
+
+    for i in range(count):
+        t = base + timedelta(seconds=i * interval)
+
+        exif = piexif.dump({
+            "0th": {},
+            "Exif": {
+                piexif.ExifIFD.DateTimeOriginal:
+                    t.strftime("%Y:%m:%d %H:%M:%S").encode(),
+                piexif.ExifIFD.SubSecTimeOriginal:
+                    f"{t.microsecond // 10000:02d}".encode(),
+            },
+            "GPS": {},
+            "1st": {},
+            "thumbnail": None,
+        })
+
+        data = head + build_app1_segment(exif) + body
+
+        with open(os.path.join(folder, f"IMG_{i:05d}.JPG"), "wb") as f:
+            f.write(data)
+
+        total += len(data)
+
+    return total
@@ -0,0 +1,409 @@
+"""
+Headless entry point (no Qt imports).
+
+Single flight:
+    python cli.py --images DIR --ulg FILE --output DIR
+
+Update the images themselves (original EXIF backed up; --restore-exif undoes it):
+    python cli.py --images DIR --ulg FILE --in-place
+
+Camera clock offset unknown (fitted to the log and reported before writing):
+    python cli.py --images DIR --ulg FILE --output DIR --clock-offset auto
+
+Many flights:
+    python cli.py --manifest flights.json --jobs 4 --summary summary.json
+
+A manifest is a JSON list of {"images", "ulg", "output"[, "apply_offset",
+"clock_offset"]} objects, or a CSV file with the same column names.
+
+Per-flight timings (instrumentation.RunStats) are always included in
+the --summary JSON; --stats prints them, --profile / --profile-dir
+add cProfile output.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import run_pipeline, OUTPUT_FORMATS, MATCH_MODES
+from streaming import run_streaming_pipeline
+from telemetry_cache import DEFAULT_CACHE_DIR
+from instrumentation import format_summary
+from progress import CancelToken, Cancelled, format_event
+from image_writer import restore_exif
+
+
+_print_lock = threading.Lock()
+
+# Seconds between --progress lines per flight
+PROGRESS_INTERVAL = 2.0
+
+
+def load_manifest(path, require_output=True):
+
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            flights = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            flights = json.load(f)
+
+        if not isinstance(flights, list) or not all(isinstance(f, dict) for f in flights):
+            raise ValueError(f"Manifest must be a JSON list of flight objects: {path}")
+
+    base = os.path.dirname(os.path.abspath(path))
+
+    # In-place runs write back into "images"
+    keys = ("images", "ulg", "output") if require_output else ("images", "ulg")
+
+    for flight in flights:
+        for key in keys:
+            if not flight.get(key):
+                raise ValueError(f"Manifest entry missing '{key}': {flight}")
+            # Relative paths are relative to the manifest
+            flight[key] = os.path.join(base, flight[key])
+
+        if not flight.get("output"):
+            flight["output"] = flight["images"]
+
+        # CSV rows always have the columns; an empty cell means the CLI default
+        if flight.get("apply_offset") not in (None, ""):
+            flight["apply_offset"] = _parse_bool(flight["apply_offset"])
+        else:
+            flight.pop("apply_offset", None)
+
+        if flight.get("clock_offset") not in (None, ""):
+            flight["clock_offset"] = parse_clock_offset(flight["clock_offset"])
+        else:
+            flight.pop("clock_offset", None)
+
+    return flights
+
+
+def _parse_bool(value):
+
+    if isinstance(value, bool):
+        return value
+
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def parse_clock_offset(value):
+    """'auto', seconds ('-28800') or [+-]H:MM[:SS] ('-8:00', '+0:07:12.5')."""
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+
+    text = str(value).strip()
+
+    if text.lower() == "auto":
+        return "auto"
+
+    try:
+        if ":" not in text:
+            return float(text)
+
+        sign = -1 if text.startswith("-") else 1
+        parts = [float(part) for part in text.lstrip("+-").split(":")]
+        if len(parts) > 3:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"Invalid clock offset: {value!r}") from None
+
+    hours, minutes, seconds = parts + [0] * (3 - len(parts))
+
+    return sign * (hours * 3600 + minutes * 60 + seconds)
+
+
+def _clock_offset_arg(value):
+
+    try:
+        return parse_clock_offset(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def run_flight(flight, args, workers, cancel_token=None):
+
+    name = os.path.basename(os.path.normpath(flight["images"]))
+
+    def log(msg):
+        if not args.quiet:
+            with _print_lock:
+                print(f"[{name}] {msg}", flush=True)
+
+    runner = run_streaming_pipeline if args.streaming else run_pipeline
+    apply_offset = flight.get("apply_offset", args.apply_offset)
+    clock_offset = flight.get("clock_offset", args.clock_offset)
+
+    result = {
+        "images": flight["images"],
+        "ulg": flight["ulg"],
+        "output": flight["output"],
+        "apply_offset": apply_offset,
+        "clock_offset": clock_offset,
+    }
+
+    start = time.perf_counter()
+    last_status = [0.0]
+
+    def on_status(event):
+        now = time.perf_counter()
+        if now - last_status[0] >= PROGRESS_INTERVAL or event.done >= event.total:
+            last_status[0] = now
+            with _print_lock:
+                print(f"[{name}] {format_event(event)}", flush=True)
+
+    def on_stats(summary):
+        # Profile text is only useful on the console, not in the JSON
+        if args.profile and "profile" in summary:
+            log(summary["profile"])
+        summary.pop("profile", None)
+        result["stats"] = summary
+
+    try:
+        violations = runner(
+            flight["images"],
+            flight["ulg"],
+            flight["output"],
+            apply_offset,
+            log_callback=log,
+            workers=workers,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            stats_callback=on_stats,
+            profile=args.profile,
+            profile_path=_profile_path(args.profile_dir, name),
+            trace_memory=args.trace_memory,
+            resume=args.resume,
+            status_callback=on_status if args.progress else None,
+            cancel_token=cancel_token,
+            output_format=args.format,
+            in_place=args.in_place,
+            backup=args.backup,
+            match_mode=args.match,
+            clock_offset=clock_offset,
+        )
+        result["status"] = "rejected" if violations else "ok"
+        result["violations"] = violations
+
+    except Cancelled:
+        result["status"] = "cancelled"
+        result["violations"] = []
+
+    except Exception as e:
+        log(f"❌ {e}")
+        result["status"] = "error"
+        result["error"] = str(e)
+        result["violations"] = []
+
+    result["seconds"] = round(time.perf_counter() - start, 3)
+
+    if args.stats and "stats" in result:
+        for line in format_summary(result["stats"]):
+            log(line)
+
+    return result
+
+
+def _profile_path(profile_dir, name):
+
+    if not profile_dir:
+        return None
+
+    os.makedirs(profile_dir, exist_ok=True)
+
+    return os.path.join(profile_dir, f"{name}.prof")
+
+
+def build_parser():
+
+    parser = argparse.ArgumentParser(
+        description="GeoTagger Pro — inject PX4 ULog telemetry into JPEG EXIF."
+    )
+
+    source = parser.add_argument_group("single flight")
+    source.add_argument("--images", help="Image folder")
+    source.add_argument("--ulg", help="PX4 ULog file, or a folder of logs")
+    source.add_argument("--output", help="Output folder")
+
+    parser.add_argument("--manifest", help="JSON or CSV list of flights")
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Flights processed concurrently in threads (default 1); overlaps "
+             "I/O and EXIF writing, ULog parsing itself does not run in parallel"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Total write processes shared by all jobs (default: CPU count)"
+    )
+    parser.add_argument(
+        "--no-offset", dest="apply_offset", action="store_false",
+        help="Do not apply the +8 hour camera offset"
+    )
+    parser.add_argument(
+        "--clock-offset", type=_clock_offset_arg, default=None,
+        help="Camera clock offset (UTC = camera + offset) in seconds or [+-]H:MM[:SS], "
+             "replacing the +8 hour setting; 'auto' fits it to the log and reports it"
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="Overlap validate/match/write (invalid images are skipped)"
+    )
+    parser.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="exif",
+        help="exif: tag JPEG copies (default); geotxt/csv/xmp: only write "
+             "geo.txt, geotags.csv or per-image .xmp sidecars"
+    )
+    parser.add_argument(
+        "--match", choices=MATCH_MODES, default="time",
+        help="time: match EXIF capture times (default); trigger: map images "
+             "in order onto the log's camera_capture / camera_trigger events"
+    )
+    parser.add_argument(
+        "--in-place", action="store_true",
+        help="Patch the EXIF of the source images instead of writing copies "
+             "(--output not needed); originals' EXIF is backed up"
+    )
+    parser.add_argument(
+        "--no-backup", dest="backup", action="store_false",
+        help="With --in-place: do not keep the original EXIF segments"
+    )
+    parser.add_argument(
+        "--restore-exif", action="store_true",
+        help="Undo --in-place on --images from its EXIF backup, then exit"
+    )
+    parser.add_argument(
+        "--no-resume", dest="resume", action="store_false",
+        help="Reprocess images already tagged by an earlier run"
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--summary", help="Write a JSON summary to this path")
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="Print per-phase timings after each flight"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Run each flight under cProfile and print the top functions"
+    )
+    parser.add_argument(
+        "--profile-dir",
+        help="Also save one .prof file per flight in this folder"
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Record peak Python memory (tracemalloc, slower)"
+    )
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument(
+        "--progress", action="store_true",
+        help="Print stage, images/s, MB/s and ETA every few seconds"
+    )
+
+    return parser
+
+
+def main(argv=None):
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.restore_exif:
+        if not args.images:
+            parser.error("--restore-exif needs --images")
+        failures = restore_exif(args.images, log_callback=print)
+        return 1 if failures else 0
+
+    if args.in_place and args.format != "exif":
+        parser.error("--in-place only applies to --format exif")
+
+    if args.streaming and args.match != "time":
+        parser.error("--match trigger cannot be combined with --streaming")
+
+    if args.streaming and args.clock_offset == "auto":
+        parser.error("--clock-offset auto cannot be combined with --streaming")
+
+    if args.manifest:
+        try:
+            flights = load_manifest(args.manifest, require_output=not args.in_place)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.images and args.ulg and (args.output or args.in_place):
+        flights = [{
+            "images": args.images,
+            "ulg": args.ulg,
+            "output": args.output or args.images,
+        }]
+    else:
+        parser.error("give --manifest or all of --images/--ulg/--output")
+
+    jobs = max(1, min(args.jobs, len(flights)))
+
+    # Only one cProfile can be active at a time
+    if (args.profile or args.profile_dir) and jobs > 1:
+        parser.error("--profile/--profile-dir need --jobs 1")
+
+    # tracemalloc is process-wide: one flight would stop another's trace
+    if args.trace_memory and jobs > 1:
+        parser.error("--trace-memory needs --jobs 1")
+
+    # Split the write processes between concurrent flights
+    total_workers = args.workers or os.cpu_count() or 1
+    workers = max(1, total_workers // jobs)
+
+    start = time.perf_counter()
+
+    cancel_token = CancelToken()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(run_flight, flight, args, workers, cancel_token)
+            for flight in flights
+        ]
+
+        try:
+            results = [future.result() for future in futures]
+        except KeyboardInterrupt:
+            # Ctrl+C: let every flight stop at its next image so outputs
+            # and resume manifests stay consistent
+            print("Cancelling...", flush=True)
+            cancel_token.cancel()
+            results = [future.result() for future in futures]
+
+    summary = {
+        "flights": results,
+        "total": len(results),
+        "ok": sum(r["status"] == "ok" for r in results),
+        "rejected": sum(r["status"] == "rejected" for r in results),
+        "errors": sum(r["status"] == "error" for r in results),
+        "cancelled": sum(r["status"] == "cancelled" for r in results),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(
+        f"{summary['ok']}/{summary['total']} flights OK, "
+        f"{summary['rejected']} with rejected images, "
+        f"{summary['errors']} failed"
+        + (f", {summary['cancelled']} cancelled" if summary["cancelled"] else "")
+        + f" ({summary['seconds']}s)",
+        flush=True
+    )
+
+    if summary["cancelled"]:
+        return 130
+
+    return 0 if summary["ok"] == summary["total"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import struct
+import numpy as np
+
+
+# Denominators of the EXIF rationals written for GPS tags
+SECONDS_PRECISION = 10000   # 1/10000 arc-second ≈ 3 mm
+ALTITUDE_PRECISION = 100    # cm
+
+# TIFF tags patched by patch_exif
+DATETIME = 0x0132
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+DATETIME_ORIGINAL = 0x9003
+DATETIME_DIGITIZED = 0x9004
+
+ASCII = 2
+LONG = 4
+
+# Per-image output of encode_gps: refs (lat, lon, alt) + 7 rationals
+# (lat d/m/s, lon d/m/s, alt) as 14 little-endian uint32
+GPS_BLOCK = struct.Struct("<3s14L")
+GPS_BLOCK_DTYPE = np.dtype([("refs", "S3"), ("values", "<u4", 14)])
+
+
+# ---------------------------------
+# GPS IFD TEMPLATE
+# ---------------------------------
+#
+# count | 7 entries x 12 bytes | next IFD | 7 rationals
+#
+#   0 GPSVersionID     BYTE[4]      2.3.0.0 (inline)
+#   1 GPSLatitudeRef   ASCII[2]     "N"/"S" (inline)  ← patched
+#   2 GPSLatitude      RATIONAL[3]  → offset          ← patched
+#   3 GPSLongitudeRef  ASCII[2]     "E"/"W" (inline)  ← patched
+#   4 GPSLongitude     RATIONAL[3]  → offset          ← patched
+#   5 GPSAltitudeRef   BYTE[1]      0/1 (inline)      ← patched
+#   6 GPSAltitude      RATIONAL[1]  → offset          ← patched
+
+GPS_ENTRIES = [
+    (0, 1, 4), (1, 2, 2), (2, 5, 3), (3, 2, 2), (4, 5, 3), (5, 1, 1), (6, 5, 1)
+]
+
+GPS_REF_OFFSETS = (22, 46, 70)       # value bytes of entries 1, 3, 5
+GPS_POINTER_OFFSETS = (34, 58, 82)   # value offsets of entries 2, 4, 6
+GPS_DATA = 2 + 12 * len(GPS_ENTRIES) + 4
+GPS_DATA_OFFSETS = (GPS_DATA, GPS_DATA + 24, GPS_DATA + 48)
+GPS_IFD_SIZE = GPS_DATA + 14 * 4
+
+
+def _gps_template(endian):
+
+    template = bytearray(GPS_IFD_SIZE)
+    struct.pack_into(endian + "H", template, 0, len(GPS_ENTRIES))
+
+    for i, (tag, kind, count) in enumerate(GPS_ENTRIES):
+        struct.pack_into(endian + "HHL", template, 2 + 12 * i, tag, kind, count)
+
+    # GPSVersionID 2.3.0.0
+    template[10:14] = b"\x02\x03\x00\x00"
+
+    return bytes(template)
+
+
+GPS_TEMPLATES = {"<": _gps_template("<"), ">": _gps_template(">")}
+
+
+# ---------------------------------
+# ENCODING (vectorized)
+# ---------------------------------
+
+def encode_gps(
+    lat,
+    lon,
+    alt,
+    seconds_precision=SECONDS_PRECISION,
+    altitude_precision=ALTITUDE_PRECISION
+):
+    """
+    lat/lon/alt arrays → GPS_BLOCK_DTYPE array, one block per image.
+
+    Coordinates are rounded (not truncated) to 1/seconds_precision of an
+    arc-second, carrying into minutes/degrees; altitude to
+    1/altitude_precision m with GPSAltitudeRef=1 below sea level.
+    Non-finite inputs give an all-zero block (see valid_blocks).
+    """
+
+    if not 0 < seconds_precision <= 1_000_000:
+        raise ValueError(f"seconds_precision out of range: {seconds_precision}")
+
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    alt = np.asarray(alt, dtype=np.float64)
+
+    finite = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(alt)
+
+    blocks = np.zeros(len(lat), dtype=GPS_BLOCK_DTYPE)
+    values = blocks["values"]
+
+    values[:, 0:6] = _dms(np.where(finite, lat, 0.0), seconds_precision)
+    values[:, 6:12] = _dms(np.where(finite, lon, 0.0), seconds_precision)
+    values[:, 12] = np.rint(np.abs(np.where(finite, alt, 0.0)) * altitude_precision)
+    values[:, 13] = altitude_precision
+
+    refs = np.empty((len(lat), 3), dtype="S1")
+    refs[:, 0] = np.where(lat >= 0, b"N", b"S")
+    refs[:, 1] = np.where(lon >= 0, b"E", b"W")
+    refs[:, 2] = np.where(alt < 0, b"\x01", b"\x00")
+
+    blocks["refs"] = refs.view("S3").ravel()
+    blocks[~finite] = np.zeros(1, dtype=GPS_BLOCK_DTYPE)
+
+    return blocks
+
+
+def valid_blocks(blocks):
+    """False where encode_gps got non-finite input."""
+    return blocks["values"][:, 13] != 0
+
+
+def _dms(value, precision):
+    """|value| degrees → (n, 6) [deg, 1, min, 1, sec*precision, precision]."""
+
+    total = np.rint(np.abs(value) * 3600 * precision).astype(np.int64)
+
+    seconds = total % (60 * precision)
+    minutes = total // (60 * precision)
+
+    out = np.empty((len(total), 6), dtype=np.int64)
+    out[:, 0] = minutes // 60
+    out[:, 1] = 1
+    out[:, 2] = minutes % 60
+    out[:, 3] = 1
+    out[:, 4] = seconds
+    out[:, 5] = precision
+
+    return out
+
+
+def gps_ifd(block, endian, base):
+    """Template GPS IFD for one GPS_BLOCK, positioned at TIFF offset base."""
+
+    refs, *values = GPS_BLOCK.unpack(block)
+
+    ifd = bytearray(GPS_TEMPLATES[endian])
+
+    for pos, ref in zip(GPS_REF_OFFSETS, refs):
+        ifd[pos] = ref
+
+    for pos, data in zip(GPS_POINTER_OFFSETS, GPS_DATA_OFFSETS):
+        struct.pack_into(endian + "L", ifd, pos, base + data)
+
+    struct.pack_into(endian + "14L", ifd, GPS_DATA, *values)
+
+    return ifd
+
+
+# ---------------------------------
+# TIFF PATCHING
+# ---------------------------------
+
+def patch_exif(tiff, block, corrected_time=None):
+    """
+    Copy of an EXIF TIFF block with the GPS IFD set from `block` and
+    DateTime / DateTimeOriginal / DateTimeDigitized set to corrected_time.
+
+    Nothing is re-serialized: existing entries are patched in place, new
+    values and IFDs are appended, so maker notes and thumbnails keep
+    their offsets. An earlier GPS IFD written by us is overwritten in
+    place, so re-tagging does not grow the file.
+
+    Raises ValueError for layouts it does not handle (no Exif IFD,
+    offsets out of range); callers fall back to piexif.
+    """
+
+    endian = _endian(tiff)
+    out = bytearray(tiff)
+
+    ifd0_off = _u32(out, 4, endian)
+    ifd0 = _entries(out, ifd0_off, endian)
+
+    if EXIF_IFD_POINTER not in ifd0:
+        raise ValueError("No Exif IFD")
+
+    exif_off = _u32(out, ifd0[EXIF_IFD_POINTER] + 8, endian)
+    exif = _entries(out, exif_off, endian)
+
+    ifd0_new = []
+    exif_new = []
+
+    # ---- Capture time ----
+    if corrected_time:
+        value = corrected_time.encode() + b"\x00"
+
+        for entries, new, tag in (
+            (ifd0, ifd0_new, DATETIME),
+            (exif, exif_new, DATETIME_ORIGINAL),
+            (exif, exif_new, DATETIME_DIGITIZED),
+        ):
+            if tag in entries:
+                _set_entry(out, entries[tag], endian, ASCII, len(value), value)
+            else:
+                new.append((tag, ASCII, len(value), value))
+
+    # ---- GPS IFD ----
+    gps_off = None
+
+    if GPS_IFD_POINTER in ifd0:
+        old = _u32(out, ifd0[GPS_IFD_POINTER] + 8, endian)
+        if _is_own_gps(out, old, endian):
+            gps_off = old
+
+    if gps_off is None:
+        gps_off = _align(out)
+        out += bytes(GPS_IFD_SIZE)
+
+    out[gps_off:gps_off + GPS_IFD_SIZE] = gps_ifd(block, endian, gps_off)
+
+    gps_pointer = struct.pack(endian + "L", gps_off)
+
+    if GPS_IFD_POINTER in ifd0:
+        _set_entry(out, ifd0[GPS_IFD_POINTER], endian, LONG, 1, gps_pointer)
+    else:
+        ifd0_new.append((GPS_IFD_POINTER, LONG, 1, gps_pointer))
+
+    # ---- Missing tags: rewrite the IFD at the end with them added ----
+    if exif_new:
+        exif_off = _relocate(out, exif_off, exif_new, endian)
+        _set_entry(
+            out, ifd0[EXIF_IFD_POINTER], endian, LONG, 1,
+            struct.pack(endian + "L", exif_off)
+        )
+
+    if ifd0_new:
+        struct.pack_into(endian + "L", out, 4, _relocate(out, ifd0_off, ifd0_new, endian))
+
+    return bytes(out)
+
+
+def _endian(tiff):
+
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        raise ValueError("Invalid TIFF byte order")
+
+    if len(tiff) < 8 or struct.unpack(endian + "H", tiff[2:4])[0] != 42:
+        raise ValueError("Invalid TIFF magic")
+
+    return endian
+
+
+def _u32(data, pos, endian):
+
+    if pos + 4 > len(data):
+        raise ValueError("Offset out of range")
+
+    return struct.unpack_from(endian + "L", data, pos)[0]
+
+
+def _entries(data, offset, endian):
+    """{tag: position of its 12-byte entry} for the IFD at offset."""
+
+    if offset + 2 > len(data):
+        raise ValueError("IFD offset out of range")
+
+    count = struct.unpack_from(endian + "H", data, offset)[0]
+
+    if offset + 2 + 12 * count + 4 > len(data):
+        raise ValueError("IFD out of range")
+
+    return {
+        struct.unpack_from(endian + "H", data, offset + 2 + 12 * i)[0]:
+            offset + 2 + 12 * i
+        for i in range(count)
+    }
+
+
+def _align(out):
+    """Pad to a word boundary (TIFF offsets must be even); return the end."""
+
+    if len(out) % 2:
+        out.append(0)
+
+    return len(out)
+
+
+def _store(out, value, endian):
+    """4-byte entry value field: inline if it fits, else appended + offset."""
+
+    if len(value) <= 4:
+        return value.ljust(4, b"\x00")
+
+    pos = _align(out)
+    out += value
+
+    return struct.pack(endian + "L", pos)
+
+
+def _set_entry(out, pos, endian, kind, count, value):
+
+    old_kind, old_count = struct.unpack_from(endian + "HL", out, pos + 2)
+
+    # Same size as before: overwrite the existing value bytes
+    if old_kind == kind and old_count == count and len(value) > 4:
+        target = _u32(out, pos + 8, endian)
+        if target + len(value) <= len(out):
+            out[target:target + len(value)] = value
+            return
+
+    field = _store(out, value, endian)
+    struct.pack_into(endian + "HL4s", out, pos + 2, kind, count, field)
+
+
+def _relocate(out, offset, additions, endian):
+    """Append a copy of the IFD at offset plus new entries; returns its offset."""
+
+    count = struct.unpack_from(endian + "H", out, offset)[0]
+    start = offset + 2
+
+    entries = [bytes(out[start + 12 * i:start + 12 * i + 12]) for i in range(count)]
+    next_ifd = bytes(out[start + 12 * count:start + 12 * count + 4])
+
+    for tag, kind, n, value in additions:
+        entries.append(
+            struct.pack(endian + "HHL", tag, kind, n) + _store(out, value, endian)
+        )
+
+    # Entries must stay sorted by tag
+    entries.sort(key=lambda entry: struct.unpack(endian + "H", entry[:2])[0])
+
+    new_offset = _align(out)
+    out += struct.pack(endian + "H", len(entries)) + b"".join(entries) + next_ifd
+
+    return new_offset
+
+
+def _is_own_gps(data, offset, endian):
+    """True if offset holds a GPS IFD with exactly our template layout."""
+
+    if offset % 2 or offset + GPS_IFD_SIZE > len(data):
+        return False
+
+    template = GPS_TEMPLATES[endian]
+
+    if data[offset:offset + 2] != template[:2]:
+        return False
+
+    for i in range(len(GPS_ENTRIES)):
+        pos = offset + 2 + 12 * i
+        if data[pos:pos + 8] != template[2 + 12 * i:10 + 12 * i]:
+            return False
+
+    return all(
+        _u32(data, offset + pos, endian) == offset + target
+        for pos, target in zip(GPS_POINTER_OFFSETS, GPS_DATA_OFFSETS)
+    )
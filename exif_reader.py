@@ -0,0 +1,204 @@
+import struct
+
+
+EXIF_HEADER = b"Exif\x00\x00"
+HEAD_BYTES = 16 * 1024
+
+# TIFF tags used by the validation phase
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+DATETIME_ORIGINAL = 0x9003
+SUBSEC_TIME_ORIGINAL = 0x9291
+
+# TIFF type → (struct code, byte size)
+TYPE_FORMATS = {
+    1: ("B", 1),    # BYTE
+    2: ("s", 1),    # ASCII
+    3: ("H", 2),    # SHORT
+    4: ("L", 4),    # LONG
+    5: ("LL", 8),   # RATIONAL
+    7: ("s", 1),    # UNDEFINED
+    9: ("l", 4),    # SLONG
+    10: ("ll", 8),  # SRATIONAL
+}
+
+
+def scan_exif(path, head_bytes=HEAD_BYTES):
+    """
+    Read DateTimeOriginal, SubSecTimeOriginal and GPS tags
+    from the JPEG header only (no image decode, no full-file read).
+
+    Raises OSError if the file cannot be read as a JPEG
+    and ValueError if the EXIF block is missing or corrupt.
+    """
+
+    # One buffered read covers the markers; other segments are seeked over
+    with open(path, "rb", buffering=head_bytes) as f:
+        try:
+            tiff = read_app1(f)
+        except (struct.error, IndexError):
+            raise ValueError("Truncated JPEG header")
+
+        header_bytes = f.tell()
+
+    if tiff is None:
+        raise ValueError("No EXIF segment")
+
+    try:
+        result = parse_tiff(tiff)
+    except struct.error:
+        raise ValueError("Corrupt EXIF block")
+
+    # How far into the file the scan had to go
+    result["header_bytes"] = header_bytes
+
+    return result
+
+
+def read_app1(f):
+    """Return the TIFF payload of the APP1 EXIF segment, or None."""
+
+    if f.read(2) != b"\xff\xd8":
+        raise OSError("Not a JPEG file")
+
+    while True:
+
+        head = f.read(2)
+
+        if len(head) < 2:
+            return None
+
+        if head[0] != 0xFF:
+            raise ValueError("Corrupt JPEG marker")
+
+        marker = head[1]
+
+        # Fill bytes
+        while marker == 0xFF:
+            marker = f.read(1)[0]
+
+        # Start of scan / end of image → no more metadata segments
+        if marker in (0xDA, 0xD9):
+            return None
+
+        # Standalone markers carry no length
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+
+        length = struct.unpack(">H", f.read(2))[0] - 2
+
+        if marker == 0xE1:
+            payload = f.read(length)
+
+            if len(payload) < length:
+                raise ValueError("Truncated EXIF segment")
+
+            if payload[:6] == EXIF_HEADER:
+                return payload[6:]
+
+            # APP1 XMP etc.
+            continue
+
+        f.seek(length, 1)
+
+
+def parse_tiff(tiff):
+    """
+    Minimal TIFF walker: IFD0 → Exif IFD / GPS IFD.
+
+    Returns {"DateTimeOriginal": str | None,
+             "SubSecTimeOriginal": str | None,
+             "GPS": {tag: value}}
+    """
+
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        raise ValueError("Invalid TIFF byte order")
+
+    if struct.unpack(endian + "H", tiff[2:4])[0] != 42:
+        raise ValueError("Invalid TIFF magic")
+
+    ifd0_offset = struct.unpack(endian + "L", tiff[4:8])[0]
+    ifd0 = _read_ifd(tiff, ifd0_offset, endian)
+
+    result = {
+        "DateTimeOriginal": None,
+        "SubSecTimeOriginal": None,
+        "GPS": {},
+    }
+
+    if EXIF_IFD_POINTER in ifd0:
+        exif_ifd = _read_ifd(tiff, ifd0[EXIF_IFD_POINTER][0], endian)
+        result["DateTimeOriginal"] = exif_ifd.get(DATETIME_ORIGINAL)
+        result["SubSecTimeOriginal"] = exif_ifd.get(SUBSEC_TIME_ORIGINAL)
+
+    if GPS_IFD_POINTER in ifd0:
+        result["GPS"] = _read_ifd(tiff, ifd0[GPS_IFD_POINTER][0], endian)
+
+    return result
+
+
+def _read_ifd(tiff, offset, endian):
+
+    if offset + 2 > len(tiff):
+        raise ValueError("IFD offset out of range")
+
+    count = struct.unpack(endian + "H", tiff[offset:offset + 2])[0]
+    entries = {}
+
+    for i in range(count):
+        entry = offset + 2 + i * 12
+
+        if entry + 12 > len(tiff):
+            raise ValueError("Truncated IFD")
+
+        tag, typ, n = struct.unpack(endian + "HHL", tiff[entry:entry + 8])
+
+        if typ not in TYPE_FORMATS:
+            continue
+
+        code, size = TYPE_FORMATS[typ]
+        nbytes = size * n
+
+        if nbytes <= 4:
+            raw = tiff[entry + 8:entry + 8 + nbytes]
+        else:
+            value_offset = struct.unpack(endian + "L", tiff[entry + 8:entry + 12])[0]
+            if value_offset + nbytes > len(tiff):
+                raise ValueError("Tag value out of range")
+            raw = tiff[value_offset:value_offset + nbytes]
+
+        entries[tag] = _decode(raw, typ, code, n, endian)
+
+    return entries
+
+
+def _decode(raw, typ, code, n, endian):
+
+    if typ == 2:
+        return raw.split(b"\x00", 1)[0].decode("ascii", errors="replace")
+
+    if typ == 7:
+        return raw
+
+    values = struct.unpack(endian + code * n, raw)
+
+    # Rationals come back as (num, den) pairs
+    if typ in (5, 10):
+        values = tuple(zip(values[0::2], values[1::2]))
+
+    return values
+
+
+def subsec_to_usec(subsec):
+    """EXIF SubSecTime digits ("5", "123") → microseconds."""
+
+    digits = "".join(c for c in (subsec or "") if c.isdigit())[:6]
+
+    if not digits:
+        return 0
+
+    return int(digits.ljust(6, "0"))
@@ -0,0 +1,181 @@
+import os
+import json
+import numpy as np
+
+from telemetry_cache import fingerprint
+from ulog_reader import load_ulog
+
+
+WINDOW_TOPICS = ["vehicle_gps_position"]
+WINDOWS_FILE = "flight_windows.json"
+
+
+def list_logs(source):
+    """A .ulg path, a folder of them, or a list of paths → sorted paths."""
+
+    if isinstance(source, (list, tuple)):
+        return sorted(source)
+
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.lower().endswith(".ulg")
+        )
+
+    return [source]
+
+
+def scan_window(ulg_path, log_callback=None):
+    """
+    UTC window and GPS coverage of one log.
+
+    Only vehicle_gps_position is parsed; FlightLogIndex.scan caches the
+    result in flight_windows.json, and the full telemetry of a log is
+    loaded later only if images are routed to it.
+    """
+
+    gps = load_ulog(ulg_path, WINDOW_TOPICS, log_callback) \
+        .get_dataset("vehicle_gps_position").data
+    utc = gps["time_utc_usec"]
+    lat = gps["latitude_deg"]
+    lon = gps["longitude_deg"]
+
+    utc = utc.astype(np.int64)
+    valid = utc > 0
+
+    if not valid.any():
+        return None
+
+    lat = lat[valid]
+    lon = lon[valid]
+    utc = np.sort(utc[valid])
+
+    return {
+        "start": int(utc[0]),
+        "end": int(utc[-1]),
+        "gps_samples": int(valid.sum()),
+        "max_gap_sec": float(np.diff(utc).max() / 1e6) if len(utc) > 1 else 0.0,
+        "lat": [float(lat.min()), float(lat.max())],
+        "lon": [float(lon.min()), float(lon.max())],
+    }
+
+
+class FlightLogIndex:
+    """
+    UTC windows of a set of ULogs, sorted by start time.
+
+    scan() reads each log once and keeps its window in cache_dir by
+    file fingerprint, so re-scanning a day's folder is just a stat +
+    head/tail hash per log. assign() sends image timestamps to logs
+    with one searchsorted call.
+    """
+
+    def __init__(self, windows):
+
+        self.windows = sorted(windows, key=lambda w: w["start"])
+
+        self.starts = np.array([w["start"] for w in self.windows], dtype=np.int64)
+        self.ends = np.array([w["end"] for w in self.windows], dtype=np.int64)
+
+        # Latest end among logs starting at or before each one (overlaps)
+        self._reach = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+
+    def __len__(self):
+        return len(self.windows)
+
+    @classmethod
+    def scan(cls, source, cache_dir=None, log_callback=None):
+
+        def log(msg):
+            if log_callback:
+                log_callback(msg)
+
+        cached = _load_windows(cache_dir)
+        windows = []
+        changed = False
+
+        for path in list_logs(source):
+
+            key = fingerprint(path, WINDOW_TOPICS)
+            window = cached.get(key)
+
+            if window is None:
+                try:
+                    window = scan_window(path, log_callback)
+                except Exception as e:
+                    log(f"⚠ {os.path.basename(path)} skipped — {e}")
+                    continue
+
+                if window is None:
+                    log(f"⚠ {os.path.basename(path)} skipped — no GPS UTC time.")
+                    continue
+
+                cached[key] = window
+                changed = True
+
+            windows.append(dict(window, path=path))
+
+        if changed:
+            _save_windows(cache_dir, cached)
+
+        if not windows:
+            raise ValueError("No usable ULog files found.")
+
+        return cls(windows)
+
+    def assign(self, image_usec):
+        """Position in self.windows for each timestamp, -1 if no log covers it."""
+
+        image_usec = np.asarray(image_usec, dtype=np.int64)
+
+        if not len(self.windows):
+            return np.full(len(image_usec), -1)
+
+        pos = np.searchsorted(self.starts, image_usec, side="right") - 1
+        candidate = np.clip(pos, 0, None)
+
+        inside = (pos >= 0) & (image_usec <= self.ends[candidate])
+        result = np.where(inside, candidate, -1)
+
+        # Rare: an earlier, longer log overlaps a later short one
+        for i in np.flatnonzero(~inside & (pos >= 0) & (image_usec <= self._reach[candidate])):
+            for j in range(pos[i] - 1, -1, -1):
+                if self.starts[j] <= image_usec[i] <= self.ends[j]:
+                    result[i] = j
+                    break
+
+        return result
+
+
+def _windows_path(cache_dir):
+    return os.path.join(cache_dir, WINDOWS_FILE)
+
+
+def _load_windows(cache_dir):
+
+    if cache_dir is None:
+        return {}
+
+    try:
+        with open(_windows_path(cache_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_windows(cache_dir, windows):
+
+    if cache_dir is None:
+        return
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        tmp = _windows_path(cache_dir) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(windows, f)
+
+        os.replace(tmp, _windows_path(cache_dir))
+    except OSError:
+        pass
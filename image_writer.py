@@ -1,91 +1,649 @@
 import os
+import time
+import struct
+import signal
+import shutil
+import hashlib
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import (
+    ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+)
 import piexif
-from PIL import Image, ImageFile
 
-ImageFile.LOAD_TRUNCATED_IMAGES = True
+from run_manifest import file_sha1
+from exif_encoder import (
+    encode_gps, valid_blocks, patch_exif, GPS_BLOCK, SECONDS_PRECISION
+)
 
 
-def write_metadata(image_folder, sampled_df, output_folder):
+EXIF_HEADER = b"Exif\x00\x00"
+MAX_SEGMENT_PAYLOAD = 0xFFFF - 2
+
+# Upper bound on images per pool batch: how far a cancel can lag
+MAX_BATCH = 32
+
+# In-place mode: each image's original APP1 segment, kept next to the images
+BACKUP_DIR = ".geotagger_exif_backup"
+BACKUP_SUFFIX = ".app1"
+
+# One image for write_image(); gps is an exif_encoder.GPS_BLOCK (or None
+# to encode it from the record)
+WriteTask = namedtuple(
+    "WriteTask",
+    ["input_path", "output_path", "record", "mode", "backup", "gps"],
+    defaults=(None, None)
+)
+
+# What each write reports back from the pool
+WriteResult = namedtuple(
+    "WriteResult",
+    [
+        "image", "error", "seconds", "bytes_read", "bytes_written",
+        "source_sha1", "output_sha1"
+    ]
+)
+
+
+def write_metadata(
+    image_folder,
+    sampled_df,
+    output_folder,
+    mode="splice",
+    workers=1,
+    result_callback=None,
+    stats=None,
+    manifest=None,
+    progress=None,
+    cancel_token=None,
+    backup_dir=None,
+    seconds_precision=SECONDS_PRECISION
+):
+    """
+    mode="splice"   → copy the JPEG byte stream, only replace/insert APP1 EXIF
+    mode="reencode" → legacy PIL decode + save (changes pixel data)
+
+    output_folder == image_folder patches the images in place ("splice"
+    only): each file is rewritten through a synced temporary file and an
+    atomic rename, so it is always either the old or the new JPEG. With
+    a `backup_dir`, the original APP1 segment of every image is saved
+    there first (see backup_path / restore_exif); an existing backup is
+    never overwritten, so it always holds the camera's original EXIF.
+
+    sampled_df is a DataFrame or a dict of equal-length columns with an
+    "image" column; rows are turned into tasks one at a time as the pool
+    drains them, so memory does not grow with the number of images.
+    GPS rationals for all rows are encoded up front in one vectorized
+    step (exif_encoder.encode_gps, arc-seconds to 1/seconds_precision).
+
+    workers > 1 sends batches of images to a process pool.
+    result_callback(img_name, error) is called once per image
+    (error is None on success). Returns the list of (img_name, error)
+    failures. An instrumentation.RunStats in `stats` receives per-image
+    write times and byte counters; a run_manifest.RunManifest in
+    `manifest` records every successful write; a progress.ProgressTracker
+    in `progress` advances per image. A set `cancel_token` stops the run
+    (progress.Cancelled) after the images already being written.
+    """
+
+    if mode not in ("splice", "reencode"):
+        raise ValueError(f"Unknown write mode: {mode}")
 
     os.makedirs(output_folder, exist_ok=True)
 
-    # Convert DataFrame to dictionary keyed by image name
-    metadata_dict = {
-        row["image"]: row
-        for _, row in sampled_df.iterrows()
-    }
+    if _same_folder(image_folder, output_folder) and mode != "splice":
+        raise ValueError("In-place update needs mode='splice'")
+
+    if backup_dir:
+        os.makedirs(backup_dir, exist_ok=True)
 
-    images = sorted(
-        f for f in os.listdir(image_folder)
-        if f.lower().endswith((".jpg", ".jpeg"))
+    count = len(sampled_df["image"])
+
+    blocks = encode_gps(
+        sampled_df["lat"], sampled_df["lon"], sampled_df["alt"], seconds_precision
     )
+    valid = valid_blocks(blocks)
 
-    for img_name in images:
+    # Records of images handed to the pool, for the run manifest
+    in_flight = {}
 
-        if img_name not in metadata_dict:
-            continue
+    def tasks():
+        for i, record in enumerate(iter_records(sampled_df)):
+
+            img_name = record["image"]
+
+            if manifest:
+                in_flight[img_name] = record
+
+            yield WriteTask(
+                os.path.join(image_folder, img_name),
+                os.path.join(output_folder, img_name),
+                record,
+                mode,
+                backup_path(backup_dir, img_name) if backup_dir else None,
+                blocks[i].tobytes() if valid[i] else None
+            )
+
+    failures = []
+    results = _run_tasks(tasks(), count, workers)
+
+    try:
+        for result in results:
+
+            img_name, error = result.image, result.error
+
+            if stats:
+                record_write(stats, result)
+
+            record = in_flight.pop(img_name, None)
+
+            if manifest and error is None:
+                manifest.record(
+                    os.path.join(image_folder, img_name),
+                    os.path.join(output_folder, img_name),
+                    record,
+                    result
+                )
+
+            if error is not None:
+                print("FAILED:", img_name)
+                print("ERROR:", error)
+                failures.append((img_name, error))
+
+            if result_callback:
+                result_callback(img_name, error)
+
+            if progress:
+                progress.advance(1, result.bytes_written)
+
+            if cancel_token:
+                cancel_token.check()
+    finally:
+        # Early exit: drop queued batches instead of finishing them
+        results.close()
+
+    return failures
+
+
+def iter_records(columns):
+    """
+    Rows of a DataFrame or {name: column} as plain dicts, one at a time
+    (numpy scalars become Python values, cheap to pickle to workers).
+    """
+
+    if hasattr(columns, "columns"):
+        columns = {name: columns[name].to_numpy() for name in columns.columns}
+
+    names = list(columns)
+
+    for values in zip(*(columns[name] for name in names)):
+        yield {
+            name: value.item() if hasattr(value, "item") else value
+            for name, value in zip(names, values)
+        }
+
+
+def write_image(task):
+    """Process-pool entry point for one WriteTask."""
+
+    img_name = os.path.basename(task.input_path)
+
+    start = time.perf_counter()
+
+    try:
+        if task.mode == "splice":
+            sizes, digests = _write_splice(
+                task.input_path, task.output_path, task.record, task.backup, task.gps
+            )
+        else:
+            sizes, digests = _write_reencode(
+                task.input_path, task.output_path, task.record, task.gps
+            )
+    except Exception as e:
+        return WriteResult(
+            img_name, str(e), time.perf_counter() - start, 0, 0, None, None
+        )
+
+    return WriteResult(
+        img_name, None, time.perf_counter() - start, *sizes, *digests
+    )
+
+
+def record_write(stats, result):
+    """Add one WriteResult to an instrumentation.RunStats."""
+
+    stats.image("write", result.seconds)
+    stats.add("bytes_read", result.bytes_read)
+    stats.add("bytes_written", result.bytes_written)
+
+
+def backup_path(backup_dir, img_name):
+    """
+    Backup of one image's original APP1 segment.
 
-        row = metadata_dict[img_name]
+    Stored as SOI + segment + EOI, i.e. a header-only JPEG, so
+    exif_reader.scan_exif() reads the original capture time from it.
+    """
 
-        input_path = os.path.join(image_folder, img_name)
-        output_path = os.path.join(output_folder, img_name)
+    return os.path.join(backup_dir, img_name + BACKUP_SUFFIX)
+
+
+def restore_exif(image_folder, backup_dir=None, log_callback=None):
+    """
+    Put the backed-up APP1 segments back into images updated in place
+    (removing the backups). Returns the list of (img_name, error) failures.
+    """
+
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    backup_dir = backup_dir or os.path.join(image_folder, BACKUP_DIR)
+    failures = []
+    restored = 0
+
+    if not os.path.isdir(backup_dir):
+        log("No EXIF backups found.")
+        return failures
+
+    for name in sorted(os.listdir(backup_dir)):
+
+        if not name.endswith(BACKUP_SUFFIX):
+            continue
+
+        img_name = name[:-len(BACKUP_SUFFIX)]
+        path = os.path.join(backup_dir, name)
 
         try:
-            with Image.open(input_path) as img:
-
-                # ---- SAFE LOAD EXIF ----
-                try:
-                    exif_dict = piexif.load(img.info.get("exif", b""))
-                except Exception:
-                    exif_dict = {
-                        "0th": {},
-                        "Exif": {},
-                        "GPS": {},
-                        "1st": {},
-                        "thumbnail": None
-                    }
-
-                # ---------------------------------
-                # 🔥 REWRITE EXIF TIME (+8h already computed)
-                # ---------------------------------
-                if "corrected_time" in row:
-                    corrected_bytes = row["corrected_time"].encode()
-
-                    exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal] = corrected_bytes
-                    exif_dict["Exif"][piexif.ExifIFD.DateTimeDigitized] = corrected_bytes
-                    exif_dict["0th"][piexif.ImageIFD.DateTime] = corrected_bytes
-
-                # ---------------------------------
-                # 🔥 GPS INJECTION
-                # ---------------------------------
-                gps_ifd = {
-                    piexif.GPSIFD.GPSLatitudeRef:
-                        "N" if row["lat"] >= 0 else "S",
-                    piexif.GPSIFD.GPSLatitude:
-                        _deg(abs(float(row["lat"]))),
-
-                    piexif.GPSIFD.GPSLongitudeRef:
-                        "E" if row["lon"] >= 0 else "W",
-                    piexif.GPSIFD.GPSLongitude:
-                        _deg(abs(float(row["lon"]))),
-
-                    piexif.GPSIFD.GPSAltitude:
-                        (int(float(row["alt"]) * 100), 100),
-                }
-
-                exif_dict["GPS"] = gps_ifd
-
-                # ---- SAVE ----
-                exif_bytes = piexif.dump(exif_dict)
-                img.save(output_path, exif=exif_bytes)
+            with open(path, "rb") as f:
+                backup = f.read()
 
+            start, end, _ = find_exif_segment(backup)
+            segment = backup[start:end] if start is not None else b""
+
+            _splice_segment(
+                os.path.join(image_folder, img_name),
+                os.path.join(image_folder, img_name),
+                segment
+            )
         except Exception as e:
-            print("FAILED:", img_name)
-            print("ERROR:", e)
+            log(f"❌ {img_name} restore failed — {e}")
+            failures.append((img_name, str(e)))
+            continue
+
+        os.remove(path)
+        restored += 1
+
+    log(f"✔ Original EXIF restored in {restored} images.")
+
+    return failures
+
+
+def write_batch(tasks):
+    """Process-pool entry point for a batch of tasks."""
+
+    return [write_image(task) for task in tasks]
+
+
+def write_stream(tasks, workers=None, batch_size=16, max_pending=None):
+    """
+    Write an iterable of tasks, yielding a WriteResult as each batch finishes.
+
+    At most max_pending batches are in flight, so a lazy task generator
+    is only pulled as fast as the pool drains it.
+    """
+
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1:
+        for task in tasks:
+            yield write_image(task)
+        return
+
+    max_pending = max_pending or workers * 2
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_ignore_sigint)
+
+    try:
+        pending = set()
+
+        for batch in _batches(tasks, batch_size):
+
+            pending.add(executor.submit(write_batch, batch))
+
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+        for future in as_completed(pending):
+            yield from future.result()
+
+    finally:
+        # Closed early (cancel / error): batches not yet started are dropped,
+        # running ones finish so no output is left half-written
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _ignore_sigint():
+    # Ctrl+C reaches the whole process group; only the parent should react
+    # (it cancels cooperatively), so workers never die mid-file
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _batches(items, size):
+
+    batch = []
+
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _run_tasks(tasks, count, workers):
+    """write_stream() sized for `count` tasks (tasks may be a generator)."""
+
+    workers = min(workers or os.cpu_count() or 1, count) or 1
+
+    # A few batches per worker keeps IPC low while still balancing load
+    batch_size = max(1, min(count // (workers * 4), MAX_BATCH))
+
+    return write_stream(tasks, workers, batch_size)
+
+
+# ---------------------------------
+# WRITERS
+# ---------------------------------
+
+def _write_splice(input_path, output_path, row, backup=None, gps=None):
+
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    start, end, insert_at = find_exif_segment(data)
+
+    segment = None
+
+    # ---- FAST PATH: patch GPS IFD + time tags into the existing block ----
+    if start is not None and gps is not None:
+        try:
+            segment = build_app1_segment(
+                patch_exif(data[start + 10:end], gps, row.get("corrected_time"))
+            )
+        except (ValueError, struct.error):
+            segment = None
+
+    # ---- SAFE LOAD EXIF (no or unusual EXIF: full piexif dump) ----
+    if segment is None:
+        exif_dict = _empty_exif()
+        if start is not None:
+            try:
+                exif_dict = piexif.load(data[start + 4:end])
+            except Exception:
+                pass
+
+        segment = build_app1_segment(_apply_row(exif_dict, row, gps))
+
+    if backup:
+        _save_backup(backup, data[start:end] if start is not None else b"")
+
+    # Everything outside the APP1/EXIF segment is copied verbatim
+    if start is None:
+        start = end = insert_at
+
+    out_hash = hashlib.sha1()
+    view = memoryview(data)
+
+    # Replacing the source itself: sync before the rename, keep permissions
+    in_place = os.path.abspath(input_path) == os.path.abspath(output_path)
+
+    with _atomic_output(output_path, durable=in_place) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            for part in (view[:start], segment, view[end:]):
+                f.write(part)
+                out_hash.update(part)
+
+            if in_place:
+                _sync(f)
+
+        if in_place:
+            shutil.copymode(input_path, tmp_path)
+
+    # Hashes are cheap here (bytes already in memory) and feed the run manifest
+    sizes = len(data), len(data) - (end - start) + len(segment)
+    digests = hashlib.sha1(data).hexdigest(), out_hash.hexdigest()
+
+    return sizes, digests
+
+
+def _splice_segment(input_path, output_path, segment):
+    """Replace (or with b"" remove) the APP1 EXIF segment; nothing else changes."""
+
+    with open(input_path, "rb") as f:
+        data = f.read()
+
+    start, end, insert_at = find_exif_segment(data)
+
+    if start is None:
+        start = end = insert_at
+
+    view = memoryview(data)
+
+    with _atomic_output(output_path, durable=True) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            for part in (view[:start], segment, view[end:]):
+                f.write(part)
+            _sync(f)
+
+        shutil.copymode(input_path, tmp_path)
+
+
+def _save_backup(path, segment):
+
+    # Keep the first backup: later runs would only save our own EXIF
+    if os.path.exists(path):
+        return
+
+    with _atomic_output(path, durable=True) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(b"\xff\xd8" + segment + b"\xff\xd9")
+            _sync(f)
+
+
+def _write_reencode(input_path, output_path, row, gps=None):
+
+    # PIL is only needed for the legacy re-encode path
+    from PIL import Image, ImageFile
+
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+    with Image.open(input_path) as img:
+
+        # ---- SAFE LOAD EXIF ----
+        try:
+            exif_dict = piexif.load(img.info.get("exif", b""))
+        except Exception:
+            exif_dict = _empty_exif()
+
+        # ---- SAVE ----
+        with _atomic_output(output_path) as tmp_path:
+            img.save(tmp_path, format="JPEG", exif=_apply_row(exif_dict, row, gps))
+
+    sizes = os.path.getsize(input_path), os.path.getsize(output_path)
+    digests = file_sha1(input_path), file_sha1(output_path)
+
+    return sizes, digests
+
+
+@contextmanager
+def _atomic_output(output_path, durable=False):
+    """
+    Yield a temp path next to output_path, renamed over it on success.
+    An output file is therefore either the old one or complete.
+
+    durable=True also syncs the directory after the rename, so the new
+    name survives a power loss (the caller syncs the file's data).
+    """
+
+    tmp_path = output_path + ".part"
+
+    try:
+        yield tmp_path
+        os.replace(tmp_path, output_path)
+
+        if durable:
+            _sync_dir(os.path.dirname(os.path.abspath(output_path)))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _sync_dir(folder):
+
+    # Directories cannot be opened on Windows; the rename is still atomic
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _same_folder(a, b):
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+# ---------------------------------
+# EXIF CONTENT
+# ---------------------------------
+
+def _empty_exif():
+    return {
+        "0th": {},
+        "Exif": {},
+        "GPS": {},
+        "1st": {},
+        "thumbnail": None
+    }
+
+
+def _apply_row(exif_dict, row, gps=None):
+
+    # ---------------------------------
+    # 🔥 REWRITE EXIF TIME (+8h already computed)
+    # ---------------------------------
+    if "corrected_time" in row:
+        corrected_bytes = row["corrected_time"].encode()
+
+        exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal] = corrected_bytes
+        exif_dict["Exif"][piexif.ExifIFD.DateTimeDigitized] = corrected_bytes
+        exif_dict["0th"][piexif.ImageIFD.DateTime] = corrected_bytes
+
+    # ---------------------------------
+    # 🔥 GPS INJECTION (same rationals as the template path)
+    # ---------------------------------
+    if gps is None:
+        block = encode_gps([row["lat"]], [row["lon"]], [row["alt"]])
+        if not valid_blocks(block)[0]:
+            raise ValueError("Non-finite GPS value")
+        gps = block[0].tobytes()
+
+    refs, *v = GPS_BLOCK.unpack(gps)
+
+    exif_dict["GPS"] = {
+        piexif.GPSIFD.GPSVersionID: (2, 3, 0, 0),
+        piexif.GPSIFD.GPSLatitudeRef: chr(refs[0]),
+        piexif.GPSIFD.GPSLatitude: ((v[0], v[1]), (v[2], v[3]), (v[4], v[5])),
+        piexif.GPSIFD.GPSLongitudeRef: chr(refs[1]),
+        piexif.GPSIFD.GPSLongitude: ((v[6], v[7]), (v[8], v[9]), (v[10], v[11])),
+        piexif.GPSIFD.GPSAltitudeRef: refs[2],
+        piexif.GPSIFD.GPSAltitude: (v[12], v[13]),
+    }
+
+    return piexif.dump(exif_dict)
+
+
+# ---------------------------------
+# JPEG SEGMENT HELPERS
+# ---------------------------------
+
+def find_exif_segment(data):
+    """
+    Walk the JPEG markers up to SOS.
+
+    Returns (start, end, insert_at):
+      start/end → byte range of the existing APP1 EXIF segment (or None)
+      insert_at → where a new APP1 goes (after SOI and any APP0/JFIF)
+    """
+
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+
+    pos = 2
+    insert_at = 2
+    size = len(data)
+
+    while pos + 4 <= size:
+
+        if data[pos] != 0xFF:
+            raise ValueError(f"Corrupt JPEG marker at offset {pos}")
+
+        marker = data[pos + 1]
+
+        # Fill bytes
+        if marker == 0xFF:
+            pos += 1
+            continue
+
+        # Start of scan / end of image → no more metadata segments
+        if marker in (0xDA, 0xD9):
+            break
+
+        # Standalone markers carry no length
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        end = pos + 2 + length
+
+        if marker == 0xE1 and data[pos + 4:pos + 10] == EXIF_HEADER:
+            return pos, end, insert_at
+
+        if marker == 0xE0 and insert_at == pos:
+            insert_at = end
+
+        pos = end
+
+    return None, None, insert_at
+
+
+def build_app1_segment(exif_bytes):
+
+    if not exif_bytes.startswith(EXIF_HEADER):
+        exif_bytes = EXIF_HEADER + exif_bytes
 
+    if len(exif_bytes) > MAX_SEGMENT_PAYLOAD:
+        raise ValueError(
+            f"EXIF too large for one APP1 segment ({len(exif_bytes)} bytes)"
+        )
 
-def _deg(value):
-    deg = int(value)
-    minute = int((value - deg) * 60)
-    sec = int((((value - deg) * 60) - minute) * 60 * 100)
-    return ((deg, 1), (minute, 1), (sec, 100))
+    return b"\xff\xe1" + struct.pack(">H", len(exif_bytes) + 2) + exif_bytes
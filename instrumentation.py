@@ -0,0 +1,172 @@
+import io
+import time
+import pstats
+import threading
+import cProfile
+import tracemalloc
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+
+
+PROFILE_TOP = 25
+
+
+class RunStats:
+    """
+    Structured timing for one pipeline run.
+
+    phase()  → wall time per phase (telemetry, validate, match, write)
+    image()  → per-image durations inside a phase
+    add()    → counters (bytes_read, bytes_written, images_*, ...)
+
+    profile=True wraps the run in cProfile (calling thread only);
+    profile_path also dumps the raw stats for snakeviz / pstats.
+    trace_memory=True records the tracemalloc peak.
+
+    Recording is thread-safe: the streaming validator records from its
+    own thread while the writer records on the caller's.
+    """
+
+    def __init__(self, profile=False, profile_path=None, trace_memory=False):
+
+        self.profile = profile or bool(profile_path)
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+
+        self.phases = {}
+        self.images = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+        self._profiler = None
+        self._owns_trace = False
+        self._start = None
+        self.total_seconds = None
+        self.peak_memory = None
+
+    # ---- Lifecycle ----
+    def start(self):
+
+        self._start = time.perf_counter()
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_trace = True
+
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+
+        if self._profiler:
+            self._profiler.disable()
+
+            if self.profile_path:
+                self._profiler.dump_stats(self.profile_path)
+
+        if self.trace_memory and tracemalloc.is_tracing():
+            _, self.peak_memory = tracemalloc.get_traced_memory()
+            if self._owns_trace:
+                tracemalloc.stop()
+
+        self.total_seconds = time.perf_counter() - self._start
+
+    # ---- Recording ----
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def image(self, phase, seconds):
+        # 8 bytes per sample instead of a float object + list slot
+        with self._lock:
+            samples = self.images.get(phase)
+            if samples is None:
+                samples = self.images[phase] = array("d")
+            samples.append(seconds)
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    # ---- Output ----
+    def summary(self):
+
+        per_image = {}
+
+        for phase, samples in self.images.items():
+            ms = np.frombuffer(samples, dtype=np.float64) * 1000
+            per_image[phase] = {
+                "count": len(ms),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+
+        summary = {
+            "total_seconds": round(self.total_seconds or 0.0, 4),
+            "phases": {
+                name: round(seconds, 4) for name, seconds in self.phases.items()
+            },
+            "per_image": per_image,
+            "counters": dict(self.counters),
+        }
+
+        if self.peak_memory is not None:
+            summary["peak_memory_mb"] = round(self.peak_memory / 1e6, 2)
+
+        if self._profiler:
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out) \
+                .sort_stats("cumulative").print_stats(PROFILE_TOP)
+            summary["profile"] = out.getvalue()
+
+            if self.profile_path:
+                summary["profile_path"] = self.profile_path
+
+        return summary
+
+
+def format_summary(summary):
+    """Human-readable lines for the log console."""
+
+    lines = ["", "⏱ RUN SUMMARY", "--------------------------------------------------"]
+
+    total = summary["total_seconds"] or 1e-9
+
+    for name, seconds in summary["phases"].items():
+        lines.append(f"{name:<12} {seconds:>9.3f}s  ({seconds / total * 100:5.1f}%)")
+
+    lines.append(f"{'total':<12} {summary['total_seconds']:>9.3f}s")
+
+    for phase, s in summary["per_image"].items():
+        lines.append(
+            f"{phase} per image: mean {s['mean_ms']:.2f} ms, "
+            f"p95 {s['p95_ms']:.2f} ms, max {s['max_ms']:.2f} ms"
+        )
+
+    counters = summary["counters"]
+
+    if "bytes_read" in counters or "bytes_written" in counters:
+        lines.append(
+            f"I/O: {counters.get('bytes_read', 0) / 1e6:.1f} MB read, "
+            f"{counters.get('bytes_written', 0) / 1e6:.1f} MB written"
+        )
+
+    if "peak_memory_mb" in summary:
+        lines.append(f"Peak memory: {summary['peak_memory_mb']} MB")
+
+    if "profile_path" in summary:
+        lines.append(f"Profile saved: {summary['profile_path']}")
+
+    lines.append("--------------------------------------------------")
+
+    return lines
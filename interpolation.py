@@ -0,0 +1,112 @@
+import numpy as np
+
+from attitude import normalize_quaternions, quaternion_to_euler
+
+
+# Below this angle SLERP degenerates to a normalized lerp
+SLERP_DOT_THRESHOLD = 0.9995
+
+
+def slerp(times, q, t):
+    """
+    Vectorized SLERP of (N, 4) quaternions sampled at sorted `times`,
+    evaluated at every element of `t`. Clamps outside the sample range.
+    """
+
+    times = np.asarray(times, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+
+    right = np.clip(np.searchsorted(times, t, side="right"), 1, len(times) - 1)
+    left = right - 1
+
+    span = times[right] - times[left]
+    frac = np.divide(
+        t - times[left], span,
+        out=np.zeros_like(t), where=span > 0
+    )
+    frac = np.clip(frac, 0.0, 1.0)[:, None]
+
+    q0 = q[left]
+    q1 = q[right]
+
+    # Take the short way round
+    dot = np.sum(q0 * q1, axis=1)
+    q1 = np.where((dot < 0)[:, None], -q1, q1)
+    dot = np.abs(dot)[:, None]
+
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    near = dot > SLERP_DOT_THRESHOLD
+
+    safe_sin = np.where(near, 1.0, sin_theta)
+    w0 = np.where(near, 1 - frac, np.sin((1 - frac) * theta) / safe_sin)
+    w1 = np.where(near, frac, np.sin(frac * theta) / safe_sin)
+
+    return normalize_quaternions(w0 * q0 + w1 * q1)
+
+
+class Trajectory:
+    """
+    Position and attitude evaluated at arbitrary UTC instants.
+
+    Position → linear interpolation over the GPS UTC axis.
+    Attitude → SLERP over the full-rate attitude topic, after mapping
+               UTC to the log's boot clock through the GPS samples.
+    """
+
+    def __init__(self, gps_df, att_df):
+
+        gps_df = gps_df[gps_df["utc_usec"] > 0]
+        order = np.argsort(gps_df["utc_usec"].to_numpy(), kind="stable")
+
+        self.utc_usec = gps_df["utc_usec"].to_numpy(dtype=np.float64)[order]
+        self.boot_usec = gps_df["timestamp"].to_numpy(dtype=np.float64)[order]
+        self.lat = gps_df["lat"].to_numpy(dtype=np.float64)[order]
+        self.lon = gps_df["lon"].to_numpy(dtype=np.float64)[order]
+        self.alt = gps_df["alt"].to_numpy(dtype=np.float64)[order]
+
+        self.att_usec = att_df["timestamp"].to_numpy(dtype=np.float64)
+        self.q = normalize_quaternions(
+            att_df[["q0", "q1", "q2", "q3"]].to_numpy()
+        )
+
+        if len(self.utc_usec) < 2 or len(self.att_usec) < 2:
+            raise ValueError("Not enough telemetry samples to interpolate.")
+
+    @property
+    def start(self):
+        return int(self.utc_usec[0])
+
+    @property
+    def end(self):
+        return int(self.utc_usec[-1])
+
+    def to_boot_time(self, utc_usec):
+        return np.interp(utc_usec, self.utc_usec, self.boot_usec)
+
+    def position_at(self, utc_usec):
+        utc_usec = np.asarray(utc_usec, dtype=np.float64)
+
+        return (
+            np.interp(utc_usec, self.utc_usec, self.lat),
+            np.interp(utc_usec, self.utc_usec, self.lon),
+            np.interp(utc_usec, self.utc_usec, self.alt),
+        )
+
+    def attitude_at(self, utc_usec):
+        return slerp(self.att_usec, self.q, self.to_boot_time(utc_usec))
+
+    def sample(self, utc_usec):
+        """Column dict (lat, lon, alt, yaw, pitch, roll) at each instant."""
+
+        lat, lon, alt = self.position_at(utc_usec)
+        yaw, pitch, roll = quaternion_to_euler(self.attitude_at(utc_usec))
+
+        return {
+            "lat": lat,
+            "lon": lon,
+            "alt": alt,
+            "yaw": yaw,
+            "pitch": pitch,
+            "roll": roll,
+        }
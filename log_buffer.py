@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+
+
+# Severity levels (same numbers as the logging module)
+INFO = 20
+WARNING = 30
+ERROR = 40
+NOTICE = 50  # session banners / results: never filtered out
+
+DEFAULT_CAPACITY = 20000
+
+
+def classify(message):
+    """Severity from the emoji prefix the pipeline already uses."""
+
+    text = message.lstrip()
+
+    if text.startswith("❌"):
+        return ERROR
+    if text.startswith("⚠"):
+        return WARNING
+
+    return INFO
+
+
+class LogBuffer:
+    """
+    Thread-safe bounded ring of (level, message).
+
+    The worker thread push()es at any rate without touching Qt;
+    the UI drain()s on a timer and renders each batch in one go.
+    When the ring is full the oldest entries are dropped.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._pushed = 0
+        self._drained = 0
+
+    def push(self, message, level=None):
+
+        if level is None:
+            level = classify(message)
+
+        with self._lock:
+            self._entries.append((level, message))
+            self._pushed += 1
+
+    def drain(self):
+        """Entries pushed since the last drain, and how many were lost."""
+
+        with self._lock:
+            new = self._pushed - self._drained
+            self._drained = self._pushed
+
+            kept = min(new, len(self._entries))
+            # Indexing from the right end is cheap on a deque
+            entries = [self._entries[i] for i in range(-kept, 0)]
+
+        return entries, new - kept
+
+    def entries(self, min_level=INFO):
+        """Everything still in the ring at or above min_level."""
+
+        with self._lock:
+            return [e for e in self._entries if e[0] >= min_level]
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            self._drained = self._pushed
@@ -11,29 +11,38 @@
 
 
 
+import time
+
+# Measured by the startup benchmark (benchmarks/startup.py)
+_START = time.perf_counter()
+
 import sys
 import os
+import threading
+import multiprocessing
 import webbrowser
 
 from datetime import datetime
 from PySide6.QtGui import QIcon
 
 from PySide6.QtWidgets import QMessageBox, QToolButton, QGraphicsDropShadowEffect
-from PySide6.QtWidgets import QCheckBox, QPlainTextEdit
+from PySide6.QtWidgets import QCheckBox, QPlainTextEdit, QComboBox
     # QPlainTextEdit Planning to add logs/console for real-time processing feedback
     
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QLineEdit, QProgressBar, QGraphicsOpacityEffect
 )
-from PySide6.QtCore import Qt, QThread, Signal, QPropertyAnimation, QEasingCurve, QSize
+from PySide6.QtCore import Qt, QThread, Signal, QPropertyAnimation, QEasingCurve, QSize, QTimer
 from PySide6.QtGui import QPixmap, QIcon
-
-from pipeline import run_pipeline
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PySide6.QtMultimediaWidgets import QVideoWidget
 from PySide6.QtCore import QUrl
 
+from log_buffer import LogBuffer, WARNING, NOTICE
+from progress import CancelToken, Cancelled, format_event
+
+# pipeline (pandas / pyulog / piexif) and QtMultimedia are imported lazily:
+# the window is shown first, then they load in the background / on first use.
+
 
 
 # ---- Resolve Base Directory into resource_path(for assets) ----
@@ -51,6 +60,31 @@ FB_ICON = resource_path("assets/facebook.png")
 GMAIL_ICON = resource_path("assets/gmail.png")
 LINKEDIN_ICON = resource_path("assets/linkedin.png")
 
+# Time from interpreter start of main.py to the first painted window
+STARTUP_BUDGET_SEC = 1.5
+STARTUP_PROBE = os.environ.get("GEOTAGGER_STARTUP_PROBE") == "1"
+
+# Path for a cProfile dump of each run (snakeviz / pstats), off by default
+PROFILE_PATH = os.environ.get("GEOTAGGER_PROFILE")
+
+HEAVY_MODULES = ("pandas", "pyulog", "piexif", "PIL", "PySide6.QtMultimedia")
+
+# Worker log/progress reach the UI in batches, not one event per image
+LOG_FLUSH_MS = 100
+MAX_LOG_BLOCKS = 5000
+
+
+def preload_data_stack():
+    """Import the processing stack off the UI thread."""
+
+    def load():
+        try:
+            import pipeline  # noqa: F401
+        except Exception as e:
+            print("Preload failed:", e)
+
+    threading.Thread(target=load, daemon=True).start()
+
 
 
 # ---- Drag & Drop Line Edit ----
@@ -69,30 +103,63 @@ class DropLineEdit(QLineEdit):
 
 # ---- Worker Thread ----
 class Worker(QThread):
-    progress = Signal(int)
     finished = Signal(list)
     error = Signal(str)
-    log = Signal(str)
+    cancelled = Signal()
+    stats = Signal(dict)
 
-    def __init__(self, img, ulg, out, interval, apply_offset):
+    def __init__(
+        self, img, ulg, out, interval, apply_offset, log_buffer,
+        output_format="exif", in_place=False, match_mode="time", clock_offset=None
+    ):
         super().__init__()
         self.img = img
         self.ulg = ulg
         self.out = out
         self.interval = interval
         self.apply_offset = apply_offset
+        self.output_format = output_format
+        self.in_place = in_place
+        self.match_mode = match_mode
+        self.clock_offset = clock_offset
+
+        # Polled by MainWindow.flush_events(); no Qt signal per image
+        self.log_buffer = log_buffer
+        self.percent = 0
+        self.status = None
+
+        self.cancel_token = CancelToken()
+
+    def set_progress(self, percent):
+        self.percent = percent
+
+    def set_status(self, event):
+        self.status = event
 
     def run(self):
         try:
+            # Already imported by preload_data_stack() in most cases
+            from pipeline import run_pipeline
+
             violations = run_pipeline(
                 self.img,
                 self.ulg,
                 self.out,
                 self.apply_offset,
-                self.progress.emit,
-                self.log.emit
+                self.set_progress,
+                self.log_buffer.push,
+                stats_callback=self.stats.emit,
+                profile_path=PROFILE_PATH,
+                status_callback=self.set_status,
+                cancel_token=self.cancel_token,
+                output_format=self.output_format,
+                in_place=self.in_place,
+                match_mode=self.match_mode,
+                clock_offset=self.clock_offset
             )
             self.finished.emit(violations)
+        except Cancelled:
+            self.cancelled.emit()
         except Exception as e:
             self.error.emit(str(e))
 
@@ -251,7 +318,7 @@ class MainWindow(QWidget):
 
         # INPUT FIELDS
         self.img_input = self.create_field("📁 Drag Image Folder Here")
-        self.ulg_input = self.create_field("📄 Drag PX4 ULog File Here")
+        self.ulg_input = self.create_field("📄 Drag PX4 ULog File (or Folder of Logs) Here")
         self.out_input = self.create_field("📦 Drag Output Folder Here")
         self.interval_input = self.create_field("⏱ Sampling Interval (seconds)")
         
@@ -267,6 +334,26 @@ class MainWindow(QWidget):
         self.utc_checkbox.setChecked(True)  # default ON
         left_panel.addWidget(self.utc_checkbox)
 
+        # Fit the camera clock to the log instead of the fixed +8h
+        self.auto_offset_checkbox = QCheckBox("Auto-detect camera clock offset (reported before writing)")
+        left_panel.addWidget(self.auto_offset_checkbox)
+
+        # Output: tagged JPEG copies, or only a geotag list for ODM / Pix4D / Metashape
+        self.format_combo = QComboBox()
+        self.format_combo.addItem("Output: tag JPEG copies (EXIF)", "exif")
+        self.format_combo.addItem("Output: geo.txt only (OpenDroneMap)", "geotxt")
+        self.format_combo.addItem("Output: CSV only (Pix4D / Metashape)", "csv")
+        self.format_combo.addItem("Output: XMP sidecars only", "xmp")
+        left_panel.addWidget(self.format_combo)
+
+        # Patch the source JPEGs instead of writing copies (no output folder)
+        self.in_place_checkbox = QCheckBox("Update images in place (original EXIF backed up)")
+        left_panel.addWidget(self.in_place_checkbox)
+
+        # Positions from the log's camera_capture / camera_trigger events
+        self.trigger_checkbox = QCheckBox("Match by camera trigger events (ignore camera clock)")
+        left_panel.addWidget(self.trigger_checkbox)
+
 
         # PROGRESS BAR
         self.progress = QProgressBar()
@@ -278,13 +365,27 @@ class MainWindow(QWidget):
 
         left_panel.addWidget(self.progress)
 
+        # Stage · images/s · MB/s · ETA
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color:gray; font-size:11px;")
+        left_panel.addWidget(self.status_label)
+
 
         # START BUTTON
         self.start_btn = QPushButton("Start Processing")
         self.start_btn.setFixedHeight(45)
         self.start_btn.clicked.connect(self.start_process)
 
-        left_panel.addWidget(self.start_btn)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setFixedHeight(45)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_process)
+
+        button_row = QHBoxLayout()
+        button_row.addWidget(self.start_btn, 3)
+        button_row.addWidget(self.cancel_btn, 1)
+
+        left_panel.addLayout(button_row)
 
 
         # --- Contact Section ---
@@ -343,28 +444,18 @@ class MainWindow(QWidget):
         right_panel = QVBoxLayout()
 
         # ---- VIDEO PANEL ----
-        self.video_widget = QVideoWidget()
-        self.video_widget.setMinimumHeight(400)
-        self.video_widget.setAspectRatioMode(Qt.IgnoreAspectRatio)
+        # Placeholder; the QVideoWidget is created by start_preview()
+        # once the window is on screen
+        self.video_container = QWidget()
+        self.video_container.setMinimumHeight(400)
+        self.video_layout = QVBoxLayout(self.video_container)
+        self.video_layout.setContentsMargins(0, 0, 0, 0)
 
-        right_panel.addWidget(self.video_widget)
+        right_panel.addWidget(self.video_container)
 
         # ---- ADD TO MAIN ----
         main_layout.addLayout(left_panel, 2)
         main_layout.addLayout(right_panel, 3)
-
-
-        # Setup Video Player
-        self.player = QMediaPlayer()
-        self.audio = QAudioOutput()
-        self.player.setAudioOutput(self.audio)
-        self.player.setVideoOutput(self.video_widget)
-
-        video_path = os.path.join(VIDEO_PATH)
-        self.player.setSource(QUrl.fromLocalFile(video_path))
-
-        self.player.setLoops(QMediaPlayer.Infinite)
-        self.player.play()
         # ---- Video Panel ENDS HERE ----
 
 
@@ -372,6 +463,8 @@ class MainWindow(QWidget):
         self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
         self.log_output.setMinimumHeight(200)
+        # Oldest lines are discarded; the full run stays in log_buffer
+        self.log_output.setMaximumBlockCount(MAX_LOG_BLOCKS)
         self.log_output.setStyleSheet("""
             background-color:#0E0E0E;
             border:1px solid #333;
@@ -382,11 +475,47 @@ class MainWindow(QWidget):
             font-size:12px;
         """)
 
+        self.log_filter = QCheckBox("Warnings && errors only")
+        self.log_filter.toggled.connect(self.refilter_log)
+
+        self.log_buffer = LogBuffer()
+        self.worker = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(LOG_FLUSH_MS)
+        self.flush_timer.timeout.connect(self.flush_events)
+
+        right_panel.addWidget(self.log_filter)
         right_panel.addWidget(self.log_output)
         # ---- LOG PANEL ENDS HERE ----
         # ---- UI ENDS HERE -----
 
 
+    # ---- Deferred Video Preview ----
+    def start_preview(self):
+        try:
+            from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
+            from PySide6.QtMultimediaWidgets import QVideoWidget
+        except ImportError as e:
+            self.append_log(f"Preview unavailable: {e}")
+            return
+
+        self.video_widget = QVideoWidget()
+        self.video_widget.setAspectRatioMode(Qt.IgnoreAspectRatio)
+        self.video_layout.addWidget(self.video_widget)
+
+        # Setup Video Player
+        self.player = QMediaPlayer()
+        self.audio = QAudioOutput()
+        self.player.setAudioOutput(self.audio)
+        self.player.setVideoOutput(self.video_widget)
+
+        video_path = os.path.join(VIDEO_PATH)
+        self.player.setSource(QUrl.fromLocalFile(video_path))
+
+        self.player.setLoops(QMediaPlayer.Infinite)
+        self.player.play()
+
     # ---- Styled Input Field ----
     def create_field(self, placeholder):
         field = DropLineEdit()
@@ -468,12 +597,63 @@ class MainWindow(QWidget):
         self.anim.start()
 
     # ---- Log Console output ----
-    def append_log(self, message):
-        self.log_output.appendPlainText(message)
+    def append_log(self, message, level=None):
+        self.log_buffer.push(message, level)
+
+        # Outside a run nothing else would flush it
+        if not self.flush_timer.isActive():
+            self.flush_events()
+
+    def flush_events(self):
+        """Render everything logged since the last flush as one block."""
+
+        if self.worker is not None:
+            self.progress.setValue(self.worker.percent)
+            if self.worker.status is not None:
+                self.status_label.setText(format_event(self.worker.status))
+
+        entries, dropped = self.log_buffer.drain()
+        min_level = self.min_log_level()
+
+        lines = [message for level, message in entries if level >= min_level]
+
+        if dropped:
+            lines.insert(0, f"⚠ {dropped} log lines dropped (buffer full).")
+
+        if not lines:
+            return
+
+        self.log_output.appendPlainText("\n".join(lines))
         self.log_output.verticalScrollBar().setValue(
             self.log_output.verticalScrollBar().maximum()
         )
 
+    def min_log_level(self):
+        return WARNING if self.log_filter.isChecked() else 0
+
+    def refilter_log(self):
+        """Re-render the console from the ring buffer with the new filter."""
+
+        self.log_buffer.drain()
+
+        lines = [
+            message
+            for _, message in self.log_buffer.entries(self.min_log_level())
+        ]
+
+        self.log_output.setPlainText("\n".join(lines[-MAX_LOG_BLOCKS:]))
+        self.log_output.verticalScrollBar().setValue(
+            self.log_output.verticalScrollBar().maximum()
+        )
+
+    def show_stats(self, summary):
+        from instrumentation import format_summary
+
+        self.flush_events()
+
+        for line in format_summary(summary):
+            self.append_log(line, NOTICE)
+
 
     # ---- Start Processing ----
     def start_process(self):
@@ -483,6 +663,10 @@ class MainWindow(QWidget):
         output_folder = self.out_input.text().strip()
         interval_text = self.interval_input.text().strip()
         apply_offset = self.utc_checkbox.isChecked()
+        output_format = self.format_combo.currentData()
+        in_place = self.in_place_checkbox.isChecked()
+        match_mode = "trigger" if self.trigger_checkbox.isChecked() else "time"
+        clock_offset = "auto" if self.auto_offset_checkbox.isChecked() else None
 
 
         # ---- FIELD VALIDATION ----
@@ -502,11 +686,20 @@ class MainWindow(QWidget):
                                 "Please select a ULog file.")
             return
 
-        if not os.path.isfile(ulg_file):
+        # A folder of logs is matched per image by UTC window
+        if not (os.path.isfile(ulg_file) or os.path.isdir(ulg_file)):
             QMessageBox.warning(self, "Invalid File",
-                                "ULog file not found.")
+                                "ULog file or folder not found.")
             return
 
+        if in_place and output_format != "exif":
+            QMessageBox.warning(self, "Invalid Option",
+                                "In-place update only applies to EXIF output.")
+            return
+
+        if in_place:
+            output_folder = image_folder
+
         if not output_folder:
             QMessageBox.warning(self, "Missing Field",
                                 "Please select an Output Folder.")
@@ -529,10 +722,12 @@ class MainWindow(QWidget):
 
 
         self.log_output.clear()
+        self.log_buffer.clear()
         self.append_log(
-            f"========== Session Started {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} =========="
+            f"========== Session Started {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ==========",
+            NOTICE
         )
-        self.append_log("")
+        self.append_log("", NOTICE)
 
         self.start_btn.setEnabled(False)
 
@@ -541,16 +736,24 @@ class MainWindow(QWidget):
             ulg_file,
             output_folder,
             interval,
-            apply_offset
-            
+            apply_offset,
+            self.log_buffer,
+            output_format,
+            in_place,
+            match_mode,
+            clock_offset
         )
 
-        self.worker.progress.connect(self.progress.setValue)
-        self.worker.log.connect(self.append_log)
+        self.worker.stats.connect(self.show_stats)
         self.worker.finished.connect(self.processing_done)
         self.worker.error.connect(self.processing_error)
+        self.worker.cancelled.connect(self.processing_cancelled)
 
         self.start_btn.setEnabled(False)
+        self.cancel_btn.setText("Cancel")
+        self.cancel_btn.setEnabled(True)
+        self.status_label.setText("")
+        self.flush_timer.start()
         self.worker.start()
 
     
@@ -560,6 +763,7 @@ class MainWindow(QWidget):
     # ---- Notification Area ----
     def processing_done(self, violations):
 
+        self.stop_flushing()
         self.start_btn.setEnabled(True)
 
         # No violations → success
@@ -570,7 +774,7 @@ class MainWindow(QWidget):
                 "All images successfully validated and injected."
             )
 
-            self.log_output.appendPlainText("\n✅ Geotagging SUCCESS.")
+            self.append_log("\n✅ Geotagging SUCCESS.", NOTICE)
             return
 
         # Violations exist → failure
@@ -603,18 +807,40 @@ class MainWindow(QWidget):
             message
         )
 
-        self.log_output.appendPlainText("\n❌ Geotagging FAILED.")
-        self.log_output.appendPlainText(
-            f"{len(violations)} image(s) rejected."
-        )
+        self.append_log("\n❌ Geotagging FAILED.", NOTICE)
+        self.append_log(f"{len(violations)} image(s) rejected.", NOTICE)
+
+
 
 
 
 
 
+    def stop_flushing(self):
+        self.flush_timer.stop()
+        self.flush_events()
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.setText("Cancel")
 
+    # ---- Cancellation ----
+    def cancel_process(self):
+        if self.worker is not None and self.worker.isRunning():
+            # Stops at the next image; images being written still complete
+            self.worker.cancel_token.cancel()
+            self.cancel_btn.setText("Cancelling…")
+            self.cancel_btn.setEnabled(False)
+
+    def processing_cancelled(self):
+        self.stop_flushing()
+        self.start_btn.setEnabled(True)
+        self.append_log(
+            "\n⏹ Geotagging CANCELLED. Images written so far are complete; "
+            "run again to continue where it stopped.",
+            NOTICE
+        )
 
     def processing_error(self, message):
+        self.stop_flushing()
         self.start_btn.setEnabled(True)
         QMessageBox.critical(self, "Processing Error", message)
         print("Error:", message)
@@ -622,7 +848,24 @@ class MainWindow(QWidget):
 
 # ---- Entry Point ----
 if __name__ == "__main__":
+    # Required for the image_writer process pool in PyInstaller builds
+    multiprocessing.freeze_support()
+
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+
+    if STARTUP_PROBE:
+        # Report once the first frame is out, before anything deferred loads
+        def report():
+            heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+            print(f"STARTUP {time.perf_counter() - _START:.4f} {','.join(heavy)}")
+            app.quit()
+
+        QTimer.singleShot(0, report)
+    else:
+        # Queued after the first paint
+        QTimer.singleShot(0, window.start_preview)
+        QTimer.singleShot(0, preload_data_stack)
+
     sys.exit(app.exec())
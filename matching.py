@@ -0,0 +1,303 @@
+from collections import namedtuple
+
+import numpy as np
+
+
+class TelemetryIndex:
+    """
+    Sorted UTC timestamp index over a telemetry DataFrame.
+
+    Built once per run; match() resolves every image timestamp
+    in a single searchsorted call instead of one full scan per image.
+    """
+
+    COLUMNS = ("lat", "lon", "alt", "yaw", "pitch", "roll")
+
+    def __init__(self, telemetry_df):
+
+        utc = telemetry_df["utc_usec"].to_numpy(dtype=np.float64)
+        valid = np.isfinite(utc)
+
+        order = np.argsort(utc[valid], kind="stable")
+
+        self.utc_usec = utc[valid][order].astype(np.int64)
+        self.rows = np.flatnonzero(valid)[order]
+
+        self.columns = {
+            name: telemetry_df[name].to_numpy(dtype=np.float64)[self.rows]
+            for name in self.COLUMNS
+            if name in telemetry_df
+        }
+
+        if len(self.utc_usec) == 0:
+            raise ValueError("Telemetry has no valid UTC timestamps.")
+
+        self.start = int(self.utc_usec[0])
+        self.end = int(self.utc_usec[-1])
+
+    def __len__(self):
+        return len(self.utc_usec)
+
+    def match(self, image_usec, max_diff_sec):
+        """
+        Nearest-sample match for an array of image timestamps (usec).
+
+        Returns (idx, diff_sec, in_window, matched):
+          idx       → position in this index (use with self.columns)
+          diff_sec  → |image - telemetry| in seconds
+          in_window → image lies inside the flight UTC window
+          matched   → in_window and diff_sec <= max_diff_sec
+        """
+
+        image_usec = np.asarray(image_usec, dtype=np.int64)
+        times = self.utc_usec
+
+        right = np.searchsorted(times, image_usec, side="left")
+        right = np.clip(right, 0, len(times) - 1)
+        left = np.clip(right - 1, 0, len(times) - 1)
+
+        diff_left = np.abs(image_usec - times[left])
+        diff_right = np.abs(times[right] - image_usec)
+
+        # Ties resolve to the earlier sample, same as idxmin()
+        idx = np.where(diff_left <= diff_right, left, right)
+        diff_sec = np.minimum(diff_left, diff_right) / 1e6
+
+        in_window = (image_usec >= self.start) & (image_usec <= self.end)
+        matched = in_window & (diff_sec <= max_diff_sec)
+
+        return idx, diff_sec, in_window, matched
+
+    def values(self, idx):
+        """Telemetry columns at the given index positions."""
+
+        return {
+            name: column[idx]
+            for name, column in self.columns.items()
+        }
+
+
+# positions[k] → logged trigger of the k-th image (-1: trigger not in log)
+TriggerAlignment = namedtuple(
+    "TriggerAlignment", "positions duplicates missing resets by_sequence"
+)
+
+
+def align_triggers(seq, image_count):
+    """
+    Map images (in capture order) onto camera trigger events (in log order)
+    in one linear pass over the trigger sequence numbers.
+
+    Repeated sequence numbers are duplicates and dropped; a jump of more
+    than one is a gap (triggers missing from the log), and a step back is
+    a counter reset (e.g. a second log or a reboot). The k-th image then
+    belongs to the k-th expected trigger. If the image count only fits
+    the logged triggers, the gaps are taken to be numbering skips and
+    images map one-to-one (by_sequence=False).
+
+    Raises ValueError when the image count fits neither.
+    """
+
+    seq = np.asarray(seq, dtype=np.int64)
+
+    if len(seq) == 0:
+        raise ValueError("Log has no camera trigger events.")
+
+    step = np.diff(seq)
+
+    kept = np.flatnonzero(np.concatenate(([True], step != 0)))
+    step = step[step != 0]
+
+    duplicates = len(seq) - len(kept)
+    resets = int(np.count_nonzero(step < 0))
+
+    # Resets start a new run right after the previous one
+    step = np.where(step < 0, 1, step)
+
+    slots = np.concatenate(([0], np.cumsum(step)))
+    expected = int(slots[-1]) + 1
+
+    if image_count == expected:
+        positions = np.full(expected, -1, dtype=np.int64)
+        positions[slots] = kept
+
+        return TriggerAlignment(
+            positions,
+            duplicates,
+            np.flatnonzero(positions < 0),
+            resets,
+            True
+        )
+
+    if image_count == len(kept):
+        return TriggerAlignment(kept, duplicates, np.empty(0, dtype=np.int64), resets, False)
+
+    raise ValueError(
+        f"{image_count} images do not match the camera triggers in the log "
+        f"({len(kept)} logged, {expected} expected from sequence numbers)."
+    )
+
+
+# ----------------------------------------
+# CAMERA CLOCK OFFSET
+# ----------------------------------------
+
+# Offsets tried: any timezone plus drift, on a 1 min grid refined to 1 s
+CLOCK_SEARCH_SEC = 14 * 3600
+CLOCK_GRID_SEC = 60
+
+# Images scored per candidate, and candidates × images per searchsorted call
+SOLVER_SAMPLE = 500
+SOLVER_CHUNK = 1 << 21
+
+# offset_sec: UTC = camera clock (read as UTC) + offset_sec
+# low_sec / high_sec: range of offsets with the same best match rate
+ClockFit = namedtuple("ClockFit", "offset_sec match_rate low_sec high_sec events")
+
+
+def match_rates(image_usec, reference_usec, offsets_usec, tolerance_usec):
+    """
+    For each candidate offset, (fraction of images within tolerance of a
+    sorted reference instant, mean distance of those images in usec).
+
+    One searchsorted over the whole (offsets × images) grid, chunked so
+    memory stays bounded.
+    """
+
+    image_usec = np.asarray(image_usec, dtype=np.int64)
+    reference_usec = np.asarray(reference_usec, dtype=np.int64)
+    offsets_usec = np.asarray(offsets_usec, dtype=np.int64)
+
+    rates = np.zeros(len(offsets_usec))
+    spread = np.full(len(offsets_usec), np.inf)
+
+    last = len(reference_usec) - 1
+    rows = max(1, SOLVER_CHUNK // max(len(image_usec), 1))
+
+    for start in range(0, len(offsets_usec), rows):
+
+        shifted = image_usec[None, :] + offsets_usec[start:start + rows, None]
+
+        right = np.clip(np.searchsorted(reference_usec, shifted), 0, last)
+        left = np.clip(right - 1, 0, last)
+
+        diff = np.minimum(
+            np.abs(shifted - reference_usec[left]),
+            np.abs(reference_usec[right] - shifted)
+        )
+
+        ok = diff <= tolerance_usec
+        count = ok.sum(axis=1)
+
+        rates[start:start + rows] = count / len(image_usec)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            spread[start:start + rows] = np.where(
+                count > 0, np.where(ok, diff, 0).sum(axis=1) / count, np.inf
+            )
+
+    return rates, spread
+
+
+def solve_clock_offset(image_usec, reference_usec, tolerance_sec, events=False):
+    """
+    Camera-to-UTC clock offset that matches the most images.
+
+    image_usec are capture times with the camera clock read as UTC.
+    reference_usec are either telemetry sample times (events=False) or
+    camera trigger instants (events=True).
+
+    Against triggers the fit is exact: candidates are the trigger-minus-
+    image differences of a few anchor images, scored with a tolerance of
+    half the trigger spacing, and the winner is refined by the median
+    residual. Telemetry only bounds the offset: every offset that keeps
+    the images inside the flight matches as well, so offset_sec is the
+    middle of [low_sec, high_sec] and callers must treat a range wider
+    than their tolerance as unsolved.
+
+    Raises ValueError when no offset within CLOCK_SEARCH_SEC matches.
+    """
+
+    image = np.sort(np.asarray(image_usec, dtype=np.int64))
+    reference = np.sort(np.asarray(reference_usec, dtype=np.int64))
+
+    if not len(image) or not len(reference):
+        raise ValueError("Clock offset needs image times and telemetry.")
+
+    sample = image[np.unique(np.linspace(0, len(image) - 1, SOLVER_SAMPLE).astype(int))]
+    tolerance = int(tolerance_sec * 1e6)
+    search = CLOCK_SEARCH_SEC * 1_000_000
+
+    if events:
+        if len(reference) > 1:
+            tolerance = min(tolerance, int(np.median(np.diff(reference))) // 2)
+
+        # The true offset pairs each anchor with its own trigger
+        anchors = image[np.unique(np.linspace(0, len(image) - 1, 3).astype(int))]
+        candidates = np.unique((reference[None, :] - anchors[:, None]).ravel())
+        candidates = candidates[np.abs(candidates) <= search]
+    else:
+        step = CLOCK_GRID_SEC * 1_000_000
+        candidates = np.arange(-search, search + 1, step, dtype=np.int64)
+
+    if not len(candidates):
+        raise ValueError("No clock offset within ±14 h matches the log.")
+
+    rates, spread = match_rates(sample, reference, candidates, tolerance)
+    best = rates.max()
+
+    if best == 0:
+        raise ValueError("No clock offset within ±14 h matches the log.")
+
+    top = np.flatnonzero(rates == best)
+
+    if events:
+        chosen = candidates[top[np.argmin(spread[top])]]
+
+        # Sub-second refinement over every image
+        shifted = image + chosen
+        right = np.clip(np.searchsorted(reference, shifted), 0, len(reference) - 1)
+        left = np.clip(right - 1, 0, len(reference) - 1)
+        nearest = np.where(
+            np.abs(shifted - reference[left]) <= np.abs(reference[right] - shifted),
+            reference[left], reference[right]
+        )
+        residual = nearest - shifted
+        close = np.abs(residual) <= tolerance
+
+        offset = int(chosen) + int(np.median(residual[close]))
+        rate, _ = match_rates(image, reference, [offset], tolerance)
+
+        return ClockFit(
+            offset / 1e6,
+            float(rate[0]),
+            int(candidates[top].min()) / 1e6,
+            int(candidates[top].max()) / 1e6,
+            True
+        )
+
+    # Widest run of best-scoring grid offsets, edges refined to 1 s
+    runs = np.split(top, np.flatnonzero(np.diff(top) > 1) + 1)
+    run = max(runs, key=len)
+
+    low = _edge(sample, reference, candidates[run[0]], -1, best, tolerance)
+    high = _edge(sample, reference, candidates[run[-1]], 1, best, tolerance)
+
+    offset = (low + high) // 2
+
+    rate, _ = match_rates(image, reference, [offset], tolerance)
+
+    return ClockFit(offset / 1e6, float(rate[0]), low / 1e6, high / 1e6, False)
+
+
+def _edge(sample, reference, offset, direction, best, tolerance):
+    """Outermost 1 s offset, within one grid step past `offset`, still scoring `best`."""
+
+    fine = offset + direction * np.arange(0, CLOCK_GRID_SEC + 1, dtype=np.int64) * 1_000_000
+    rates, _ = match_rates(sample, reference, fine, tolerance)
+
+    # First drop below best ends the run
+    below = np.flatnonzero(rates < best)
+    last = below[0] - 1 if len(below) else len(fine) - 1
+
+    return int(fine[last])
@@ -1,14 +1,395 @@
 import os
+import time
 from datetime import datetime, timedelta, timezone
-from PIL import Image
-import piexif
+import numpy as np
 import pandas as pd
 
-from ulog_reader import extract_telemetry
-from image_writer import write_metadata
+from telemetry_cache import load_streams, DEFAULT_CACHE_DIR
+from ulog_reader import merge_streams
+from image_writer import write_metadata, iter_records, backup_path, BACKUP_DIR
+from sidecar import write_sidecars, SIDECAR_FORMATS
+from exif_reader import scan_exif, subsec_to_usec
+from matching import TelemetryIndex, align_triggers, solve_clock_offset
+from interpolation import Trajectory
+from instrumentation import RunStats
+from run_manifest import RunManifest, run_key
+from flight_index import FlightLogIndex, list_logs
+from progress import ProgressTracker, Cancelled
 
 
 PH_TZ = timezone(timedelta(hours=8))
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+MAX_ALLOWED_DIFF = 3  # seconds tolerance
+
+# "exif" tags copies of the JPEGs; the rest only write geotag sidecars
+OUTPUT_FORMATS = ("exif",) + SIDECAR_FORMATS
+
+# "time" matches EXIF capture times; "trigger" maps images in capture
+# order onto the log's camera_capture / camera_trigger events
+MATCH_MODES = ("time", "trigger")
+
+
+def iter_images(image_folder):
+    """Stream JPEG names straight from the directory (unsorted)."""
+
+    with os.scandir(image_folder) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith((".jpg", ".jpeg")) and entry.is_file():
+                yield entry.name
+
+
+def exif_source(image_folder, img_name, backup_dir=None):
+    """
+    File to read an image's capture time from: its in-place APP1 backup
+    if there is one (the image itself already carries the corrected time).
+    """
+
+    if backup_dir:
+        path = backup_path(backup_dir, img_name)
+        if os.path.exists(path):
+            return path
+
+    return os.path.join(image_folder, img_name)
+
+
+def validate_image(img_path, stats=None):
+    """
+    Phase 1 check for one image.
+    Returns (image_time, None) or (None, (violation reason, log message)).
+    """
+
+    start = time.perf_counter()
+
+    try:
+        return _validate_image(img_path, stats)
+    finally:
+        if stats:
+            stats.image("validate", time.perf_counter() - start)
+
+
+def _validate_image(img_path, stats):
+
+    # Header-only read: JPEG markers → APP1 → TIFF IFDs
+    try:
+        exif = scan_exif(img_path)
+    except OSError:
+        return None, ("Cannot open image", "cannot be opened.")
+    except ValueError:
+        return None, ("Invalid EXIF", "has invalid EXIF.")
+
+    if stats:
+        stats.add("bytes_read", exif["header_bytes"])
+
+    if exif["DateTimeOriginal"] is None:
+        return None, ("Missing DateTimeOriginal", "missing DateTimeOriginal.")
+
+    dt_string = exif["DateTimeOriginal"]
+
+    try:
+        image_time = datetime.strptime(
+            dt_string,
+            "%Y:%m:%d %H:%M:%S"
+        )
+    except Exception:
+        return None, ("Invalid date format", "has invalid date format.")
+
+    if image_time.year < 2000:
+        return None, (
+            f"Invalid camera date: {image_time.year}",
+            f"has invalid year {image_time.year}."
+        )
+
+    # Sub-second precision when the camera records it
+    image_time = image_time.replace(
+        microsecond=subsec_to_usec(exif["SubSecTimeOriginal"])
+    )
+
+    return image_time, None
+
+
+def correct_time(image_time, apply_offset, clock_offset=None):
+    """
+    Camera clock → (UTC usec or None, corrected EXIF date string in PHT).
+
+    Without clock_offset the optional +8h offset is applied and the result
+    read as PHT, whatever the host timezone. clock_offset (seconds, see
+    matching.solve_clock_offset) replaces it: UTC = camera clock + offset.
+    """
+
+    if clock_offset is None:
+        if apply_offset:
+            image_time_corrected = image_time + timedelta(hours=8)
+        else:
+            image_time_corrected = image_time
+
+        aware = image_time_corrected.replace(tzinfo=PH_TZ)
+    else:
+        aware = image_time.replace(tzinfo=timezone.utc) + timedelta(seconds=clock_offset)
+
+    try:
+        image_timestamp_usec = (aware - EPOCH) // timedelta(microseconds=1)
+        corrected = aware.astimezone(PH_TZ)
+    except (OverflowError, ValueError):
+        return None, image_time.strftime("%Y:%m:%d %H:%M:%S")
+
+    return (
+        image_timestamp_usec,
+        corrected.strftime("%Y:%m:%d %H:%M:%S")
+    )
+
+
+def check_clock_offset(clock_offset):
+
+    if clock_offset is None or clock_offset == "auto":
+        return
+
+    if isinstance(clock_offset, bool) or not isinstance(clock_offset, (int, float)):
+        raise ValueError(f"Invalid clock offset: {clock_offset!r}")
+
+
+def clock_reading(image_time):
+    """Camera clock read as UTC (usec), the solver's input."""
+
+    return (image_time.replace(tzinfo=timezone.utc) - EPOCH) // timedelta(microseconds=1)
+
+
+def format_offset(seconds):
+    """Signed h:mm:ss.s, e.g. -28792.2 → '-7:59:52.2'."""
+
+    sign = "-" if seconds < 0 else "+"
+    seconds = abs(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, rest = divmod(rest, 60)
+
+    return f"{sign}{int(hours)}:{int(minutes):02d}:{rest:04.1f}"
+
+
+def _pht(usec):
+    return datetime.fromtimestamp(usec / 1e6, tz=timezone.utc).astimezone(PH_TZ)
+
+
+def load_flight(ulg_path, cache_dir, interpolate, log):
+    """
+    Load telemetry once per run.
+    Returns (TelemetryIndex, Trajectory or None, camera trigger DataFrame).
+    """
+
+    gps_df, att_df, trig_df = load_streams(ulg_path, cache_dir, log_callback=log)
+    telemetry_df = merge_streams(gps_df, att_df)
+
+    if telemetry_df.empty:
+        raise ValueError("Telemetry data is empty.")
+
+    telemetry_df["utc_usec"] = pd.to_numeric(
+        telemetry_df["utc_usec"],
+        errors="coerce"
+    )
+
+    # Sorted timestamp index, built once per run
+    index = TelemetryIndex(telemetry_df)
+
+    log("🔎 Validating flight time window...")
+
+    flight_start = index.start
+    flight_end   = index.end
+
+    flight_start_dt = _pht(flight_start)
+    flight_end_dt   = _pht(flight_end)
+
+    log(f"Flight Start (PHT UTC +8): {flight_start_dt}")
+    log(f"Flight End   (PHT UTC +8): {flight_end_dt}")
+
+    trajectory = Trajectory(gps_df, att_df) if interpolate else None
+
+    return index, trajectory, trig_df
+
+
+def sample_matched(index, trajectory, idx, image_usec):
+
+    if trajectory is not None:
+        # Linear position + SLERP attitude at the exact image instants
+        return trajectory.sample(image_usec)
+
+    return index.values(idx)
+
+
+class Flights:
+    """
+    Telemetry for one ULog, or for a folder / list of ULogs (a day's flights).
+
+    With several logs each image goes to the log whose UTC window
+    contains it; a log is loaded on first use and kept for the run,
+    so every needed log is parsed at most once.
+    """
+
+    def __init__(self, ulg_path, cache_dir, interpolate, log):
+
+        self.cache_dir = cache_dir
+        self.interpolate = interpolate
+        self.log = log
+        self.loaded = {}
+
+        if os.path.isdir(ulg_path) or isinstance(ulg_path, (list, tuple)):
+            self.logs = FlightLogIndex.scan(list_logs(ulg_path), cache_dir, log)
+
+            log(f"🗂 {len(self.logs)} flight logs indexed:")
+            for w in self.logs.windows:
+                log(
+                    f"   {os.path.basename(w['path'])}: "
+                    f"{_pht(w['start']):%H:%M:%S} → {_pht(w['end']):%H:%M:%S} PHT"
+                )
+        else:
+            self.logs = None
+            self.loaded[0] = load_flight(ulg_path, cache_dir, interpolate, log)
+
+    def _flight(self, i):
+
+        if i not in self.loaded:
+            path = self.logs.windows[i]["path"]
+            self.log(f"Loading {os.path.basename(path)}...")
+            self.loaded[i] = load_flight(path, self.cache_dir, self.interpolate, self.log)
+
+        return self.loaded[i]
+
+    def match(self, image_usec):
+        """
+        Returns (diff_sec, in_window, matched, values); values holds the
+        telemetry columns of the matched images, in order.
+        """
+
+        image_usec = np.asarray(image_usec, dtype=np.int64)
+
+        if self.logs is None:
+            index, trajectory, _ = self.loaded[0]
+            idx, diff_sec, in_window, matched = index.match(image_usec, MAX_ALLOWED_DIFF)
+
+            values = sample_matched(index, trajectory, idx[matched], image_usec[matched])
+
+            return diff_sec, in_window, matched, values
+
+        n = len(image_usec)
+        diff_sec = np.full(n, np.inf)
+        in_window = np.zeros(n, dtype=bool)
+        matched = np.zeros(n, dtype=bool)
+        columns = {}
+
+        which = self.logs.assign(image_usec)
+
+        for i in np.unique(which[which >= 0]):
+
+            sel = np.flatnonzero(which == i)
+            index, trajectory, _ = self._flight(int(i))
+
+            idx, diff, inside, ok = index.match(image_usec[sel], MAX_ALLOWED_DIFF)
+
+            diff_sec[sel] = diff
+            in_window[sel] = inside
+            matched[sel] = ok
+
+            values = sample_matched(index, trajectory, idx[ok], image_usec[sel][ok])
+
+            for name, column in values.items():
+                columns.setdefault(name, np.full(n, np.nan))[sel[ok]] = column
+
+        values = {name: column[matched] for name, column in columns.items()}
+
+        if not columns:
+            values = {name: np.empty(0) for name in TelemetryIndex.COLUMNS}
+
+        return diff_sec, in_window, matched, values
+
+    def _all(self):
+        """Every log, in time order (loads the ones not used yet)."""
+
+        if self.logs is None:
+            return [self.loaded[0]]
+
+        return [self._flight(i) for i in range(len(self.logs))]
+
+    def clock_reference(self):
+        """
+        (sorted UTC usec, events) to fit the camera clock against: the
+        trigger instants if the logs have any, else the telemetry samples.
+        """
+
+        flights = self._all()
+
+        triggers = np.concatenate([
+            trig_df["utc_usec"].to_numpy(dtype=np.int64) for _, _, trig_df in flights
+        ])
+        triggers = triggers[triggers > 0]
+
+        if len(triggers):
+            return np.sort(triggers), True
+
+        return np.sort(np.concatenate([index.utc_usec for index, _, _ in flights])), False
+
+    def match_triggers(self, image_count):
+        """
+        Telemetry at the camera trigger instants, for image_count images
+        in capture order (see matching.align_triggers).
+
+        Returns (alignment, trigger_usec, values); trigger_usec and values
+        are indexed by image, rows of missing triggers are NaN / 0.
+        """
+
+        flights = self._all()
+
+        # One trigger stream over the day's flights, in time order
+        triggers = pd.concat([trig_df for _, _, trig_df in flights], ignore_index=True)
+        source = np.repeat(
+            np.arange(len(flights)), [len(trig_df) for _, _, trig_df in flights]
+        )
+
+        alignment = align_triggers(triggers["seq"].to_numpy(), image_count)
+
+        if alignment.duplicates:
+            self.log(f"⚠ {alignment.duplicates} duplicate camera trigger events dropped.")
+        if alignment.resets:
+            self.log(f"⚠ Trigger sequence restarted {alignment.resets} time(s).")
+        if not alignment.by_sequence:
+            self.log("⚠ Trigger sequence has gaps but matches the image count — mapped in order.")
+
+        positions = alignment.positions
+        found = positions >= 0
+
+        trigger_usec = np.zeros(image_count, dtype=np.int64)
+        trigger_usec[found] = triggers["utc_usec"].to_numpy(dtype=np.int64)[positions[found]]
+
+        columns = {
+            name: np.full(image_count, np.nan) for name in TelemetryIndex.COLUMNS
+        }
+
+        for i, (index, trajectory, _) in enumerate(flights):
+
+            sel = np.flatnonzero(found)
+            sel = sel[source[positions[sel]] == i]
+
+            if not len(sel):
+                continue
+
+            # Exact trigger instants: no tolerance, the event is in the log
+            idx, _, _, _ = index.match(trigger_usec[sel], MAX_ALLOWED_DIFF)
+            values = sample_matched(index, trajectory, idx, trigger_usec[sel])
+
+            for name, column in values.items():
+                columns[name][sel] = column
+
+        return alignment, trigger_usec, columns
+
+
+def write_target(image_folder, output_folder, output_format, in_place, backup):
+    """(output_folder, backup_dir) for the chosen write target."""
+
+    if not in_place:
+        return output_folder, None
+
+    if output_format != "exif":
+        raise ValueError("In-place update only applies to EXIF output.")
+
+    return image_folder, os.path.join(image_folder, BACKUP_DIR) if backup else None
+
 
 def run_pipeline(
     image_folder,
@@ -16,21 +397,175 @@ def run_pipeline(
     output_folder,
     apply_offset,
     progress_callback=None,
-    log_callback=None
+    log_callback=None,
+    workers=None,
+    cache_dir=DEFAULT_CACHE_DIR,
+    interpolate=True,
+    stats_callback=None,
+    profile=False,
+    profile_path=None,
+    trace_memory=False,
+    resume=True,
+    status_callback=None,
+    cancel_token=None,
+    output_format="exif",
+    in_place=False,
+    backup=True,
+    match_mode="time",
+    clock_offset=None
 ):
+    """
+    stats_callback(summary) receives the instrumentation.RunStats summary
+    (per-phase / per-image timings, byte counters, optional cProfile and
+    tracemalloc results) when the run ends, successfully or not.
+
+    resume=True skips images the output folder's run manifest already
+    lists as tagged and unchanged; resume=False reprocesses everything.
+
+    progress_callback(percent) covers every stage; status_callback gets
+    progress.ProgressEvent (stage, counts, images/s, MB/s, ETA).
+    Setting cancel_token (progress.CancelToken) raises progress.Cancelled
+    at the next image; everything written so far is complete and in the
+    manifest, so a re-run resumes from there.
+
+    output_format="geotxt" / "csv" / "xmp" writes only geotag sidecars
+    (see sidecar.py) and leaves the JPEGs untouched; every matched image
+    is listed each run, so resume does not apply.
+
+    in_place=True patches the EXIF of the images in image_folder instead
+    of writing copies (output_folder is ignored). Each file is replaced
+    atomically; with backup=True the original APP1 segment of every image
+    is kept in image_folder/.geotagger_exif_backup (image_writer.restore_exif
+    puts it back) and capture times are read from there on later runs,
+    so the offset is never applied twice.
+
+    match_mode="trigger" takes positions from the camera trigger events
+    of the log instead of the EXIF capture times, which only order the
+    images (see Flights.match_triggers). Every image of the folder must
+    be there, including ones an earlier run already tagged.
+
+    clock_offset (seconds, UTC = camera clock + offset) replaces the +8h
+    apply_offset toggle; "auto" fits it to the log before matching
+    (matching.solve_clock_offset) and logs the result.
+    """
+
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode: {match_mode}")
+
+    check_clock_offset(clock_offset)
+
+    output_folder, backup_dir = write_target(
+        image_folder, output_folder, output_format, in_place, backup
+    )
 
     def log(msg):
         if log_callback:
             log_callback(msg)
 
-    images = sorted(
-        [f for f in os.listdir(image_folder)
-         if f.lower().endswith((".jpg", ".jpeg"))]
-    )
+    stats = RunStats(profile, profile_path, trace_memory)
+    stats.start()
+
+    progress = ProgressTracker(progress_callback, status_callback)
+    manifest = None
+
+    try:
+        if output_format == "exif":
+            manifest = RunManifest(
+                output_folder,
+                run_key(
+                    ulg_path, apply_offset, interpolate,
+                    match=match_mode, clock_offset=clock_offset
+                ),
+                resume,
+                log
+            )
+
+        return _run_pipeline(
+            image_folder,
+            ulg_path,
+            output_folder,
+            apply_offset,
+            progress,
+            cancel_token,
+            log,
+            workers,
+            cache_dir,
+            interpolate,
+            stats,
+            manifest,
+            output_format,
+            backup_dir,
+            match_mode,
+            clock_offset
+        )
+    except Cancelled:
+        written = stats.counters.get("images_written", 0)
+        if manifest:
+            log(f"⏹ Cancelled — {written} images written; re-run to resume.")
+        else:
+            log("⏹ Cancelled — no sidecar written.")
+        raise
+    finally:
+        if manifest:
+            manifest.close()
+        stats.stop()
+        if stats_callback:
+            stats_callback(stats.summary())
+
+
+def _run_pipeline(
+    image_folder,
+    ulg_path,
+    output_folder,
+    apply_offset,
+    progress,
+    cancel_token,
+    log,
+    workers,
+    cache_dir,
+    interpolate,
+    stats,
+    manifest,
+    output_format,
+    backup_dir,
+    match_mode,
+    clock_offset
+):
+
+    def check_cancel():
+        if cancel_token:
+            cancel_token.check()
+
+    images = sorted(iter_images(image_folder))
 
     if not images:
         raise ValueError("No JPG images found.")
 
+    # Images tagged by an earlier (possibly interrupted) run
+    done = []
+
+    if manifest:
+        with stats.phase("resume"):
+            images, done = manifest.pending(image_folder, images)
+
+    if done:
+        stats.add("images_skipped", len(done))
+        log(f"✔ {len(done)} images already tagged and unchanged — skipped.")
+
+    if not images:
+        log("Nothing new to process.")
+        progress.finish()
+        return []
+
+    # Trigger alignment needs the whole sequence; tagged images are not rewritten
+    skip = set(done) if match_mode == "trigger" else set()
+
+    if skip:
+        images = sorted(images + done)
+
     log("Starting image validation...")
 
     # ----------------------------------------
@@ -40,52 +575,30 @@ def run_pipeline(
     image_times = []
     violations = []
 
-    for img_name in images:
-
-        img_path = os.path.join(image_folder, img_name)
+    progress.stage("validate", len(images))
 
-        try:
-            with Image.open(img_path) as img:
-                exif_bytes = img.info.get("exif", b"")
-        except Exception:
-            violations.append(f"{img_name} (Cannot open image)")
-            log(f"⚠ {img_name} cannot be opened.")
-            continue
-
-        try:
-            exif_dict = piexif.load(exif_bytes)
-        except Exception:
-            violations.append(f"{img_name} (Invalid EXIF)")
-            log(f"⚠ {img_name} has invalid EXIF.")
-            continue
+    with stats.phase("validate"):
+        for img_name in images:
 
-        if piexif.ExifIFD.DateTimeOriginal not in exif_dict["Exif"]:
-            violations.append(f"{img_name} (Missing DateTimeOriginal)")
-            log(f"⚠ {img_name} missing DateTimeOriginal.")
-            continue
+            check_cancel()
 
-        dt_string = exif_dict["Exif"][
-            piexif.ExifIFD.DateTimeOriginal
-        ].decode()
-
-        try:
-            image_time = datetime.strptime(
-                dt_string,
-                "%Y:%m:%d %H:%M:%S"
+            image_time, problem = validate_image(
+                exif_source(image_folder, img_name, backup_dir),
+                stats
             )
-        except Exception:
-            violations.append(f"{img_name} (Invalid date format)")
-            log(f"⚠ {img_name} has invalid date format.")
-            continue
 
-        if image_time.year < 2000:
-            violations.append(
-                f"{img_name} (Invalid camera date: {image_time.year})"
-            )
-            log(f"⚠ {img_name} has invalid year {image_time.year}.")
-            continue
+            if problem:
+                reason, message = problem
+                violations.append(f"{img_name} ({reason})")
+                log(f"⚠ {img_name} {message}")
+                progress.advance()
+                continue
+
+            image_times.append((img_name, image_time))
+            progress.advance()
 
-        image_times.append((img_name, image_time))
+    stats.add("images_total", len(images))
+    stats.add("images_valid", len(image_times))
 
     if violations:
         log("")
@@ -110,120 +623,135 @@ def run_pipeline(
     # PHASE 2 — TELEMETRY MATCHING
     # ----------------------------------------
 
-    telemetry_df = extract_telemetry(ulg_path)
-
-    log("🔎 Validating flight time window...")
-
-    flight_start = telemetry_df["utc_usec"].min()
-    flight_end   = telemetry_df["utc_usec"].max()
-
-    flight_start_dt = datetime.fromtimestamp(flight_start / 1e6, tz=timezone.utc).astimezone(PH_TZ)
-    flight_end_dt   = datetime.fromtimestamp(flight_end / 1e6, tz=timezone.utc).astimezone(PH_TZ)
-
-    log(f"Flight Start (PHT UTC +8): {flight_start_dt}")
-    log(f"Flight End   (PHT UTC +8): {flight_end_dt}")
-
-
-
-    if telemetry_df.empty:
-        raise ValueError("Telemetry data is empty.")
+    progress.stage("telemetry", 1, rates=False)
 
-    telemetry_df["utc_usec"] = pd.to_numeric(
-        telemetry_df["utc_usec"],
-        errors="coerce"
-    )
-
-    results = []
-    total = len(image_times)
+    with stats.phase("telemetry"):
+        flights = Flights(ulg_path, cache_dir, interpolate, log)
 
+    check_cancel()
     log("Starting telemetry matching...")
 
-    utc_series = telemetry_df["utc_usec"]
+    progress.stage("match", len(image_times))
 
-    MAX_ALLOWED_DIFF = 3  # seconds tolerance
+    with stats.phase("match"):
+        # Apply optional offset and convert to timestamps
+        names = []
+        corrected_times = []
+        image_usec = []
 
-    for i, (img_name, image_time) in enumerate(image_times):
+        if clock_offset == "auto":
+            clock_offset = _solve_clock_offset(flights, image_times, log)
 
-        # Apply optional offset
-        if apply_offset:
-            image_time_corrected = image_time + timedelta(hours=8)
-        else:
-            image_time_corrected = image_time
+        for img_name, image_time in image_times:
 
-        # Convert to timestamp
-        try:
-            image_timestamp_usec = int(
-                image_time_corrected.timestamp() * 1e6
-            )
-        except Exception:
-            violations.append(
-                f"{img_name} (Timestamp conversion failed - Invalid EXIF date)"
+            image_timestamp_usec, corrected = correct_time(
+                image_time, apply_offset, clock_offset
             )
 
-            log(f"⚠ {img_name} timestamp conversion failed.")
-            log("   → Check image DateTimeOriginal.")
-            log("   → Remove image if not important.")
-            continue
+            if image_timestamp_usec is None:
+                violations.append(
+                    f"{img_name} (Timestamp conversion failed - Invalid EXIF date)"
+                )
 
-        # 🔥 FLIGHT WINDOW VALIDATION
-        if image_timestamp_usec < flight_start or image_timestamp_usec > flight_end:
-            violations.append(
-                f"{img_name} (Outside flight time window)"
+                log(f"⚠ {img_name} timestamp conversion failed.")
+                log("   → Check image DateTimeOriginal.")
+                log("   → Remove image if not important.")
+                continue
+
+            names.append(img_name)
+            corrected_times.append(corrected)
+            image_usec.append(image_timestamp_usec)
+
+        if match_mode == "trigger":
+            names, corrected_times, matched, results = _match_triggers(
+                flights, names, corrected_times, image_usec, skip, violations, log
             )
 
-            log(f"❌ {img_name} rejected — Outside telemetry flight window.")
-            continue
+        else:
+            # 🔥 Nearest sample, flight window and tolerance for all images at once
+            diff_sec, in_window, matched, results = flights.match(image_usec)
 
-        # Find closest telemetry timestamp
-        time_diffs = (utc_series - image_timestamp_usec).abs()
-        closest_idx = time_diffs.idxmin()
+            for i, img_name in enumerate(names):
 
-        min_diff_usec = time_diffs.loc[closest_idx]
-        min_diff_sec = min_diff_usec / 1e6
+                # 🔥 FLIGHT WINDOW VALIDATION
+                if not in_window[i]:
+                    violations.append(
+                        f"{img_name} (Outside flight time window)"
+                    )
 
-        # 🔥 STRICT TIME TOLERANCE CHECK
-        if min_diff_sec > MAX_ALLOWED_DIFF:
-            violations.append(
-                f"{img_name} (No matching telemetry. Δ {min_diff_sec:.2f}s)"
-            )
+                    log(f"❌ {img_name} rejected — Outside telemetry flight window.")
+                    continue
 
-            log(f"❌ {img_name} rejected — Time mismatch {min_diff_sec:.2f}s.")
-            continue
+                # 🔥 STRICT TIME TOLERANCE CHECK
+                if not matched[i]:
+                    violations.append(
+                        f"{img_name} (No matching telemetry. Δ {diff_sec[i]:.2f}s)"
+                    )
 
-        telemetry_row = telemetry_df.loc[closest_idx]
+                    log(f"❌ {img_name} rejected — Time mismatch {diff_sec[i]:.2f}s.")
+                    continue
 
-        results.append({
-            "image": img_name,
-            "lat": float(telemetry_row["lat"]),
-            "lon": float(telemetry_row["lon"]),
-            "alt": float(telemetry_row["alt"]),
-            "yaw": float(telemetry_row["yaw"]),
-            "pitch": float(telemetry_row["pitch"]),
-            "roll": float(telemetry_row["roll"]),
-            "corrected_time":
-                image_time_corrected.strftime("%Y:%m:%d %H:%M:%S")
-        })
+                log(f"✔ Injected telemetry into {img_name}")
 
-        log(f"✔ Injected telemetry into {img_name}")
+        results["image"] = np.asarray(names, dtype=object)[matched]
+        results["corrected_time"] = np.asarray(corrected_times, dtype=object)[matched]
 
-        if progress_callback:
-            percent = int((i + 1) / total * 100)
-            progress_callback(percent)
+    stats.add("images_matched", int(matched.sum()))
+    stats.add("logs_loaded", len(flights.loaded))
 
+    progress.finish_stage()
+    check_cancel()
 
     # ----------------------------------------
     # FINAL PHASE — FINISHING / WRITE METADATA
     # ----------------------------------------
 
-    results_df = pd.DataFrame(results)
-
     # If no images were successfully matched
-    if not results:
+    if not matched.any():
         log("❌ No valid images matched telemetry.")
         return violations if violations else ["No valid images matched telemetry."]
 
-    log("Writing metadata to images...")
-    write_metadata(image_folder, results_df, output_folder)
+    if output_format == "exif":
+        log("Writing metadata to images...")
+    else:
+        log(f"Writing {output_format} geotags (images left untouched)...")
+
+    def on_written(img_name, error):
+        if error is None:
+            stats.add("images_written")
+        else:
+            violations.append(f"{img_name} (Write failed: {error})")
+            log(f"❌ {img_name} write failed — {error}")
+
+    progress.stage("write", int(matched.sum()))
+
+    with stats.phase("write"):
+        # Columns go straight to the writer (no per-row DataFrame objects)
+        if output_format == "exif":
+            write_metadata(
+                image_folder,
+                results,
+                output_folder,
+                workers=workers,
+                result_callback=on_written,
+                stats=stats,
+                manifest=manifest,
+                progress=progress,
+                cancel_token=cancel_token,
+                backup_dir=backup_dir
+            )
+        else:
+            write_sidecars(
+                iter_records(results),
+                output_folder,
+                output_format,
+                result_callback=on_written,
+                stats=stats,
+                progress=progress,
+                cancel_token=cancel_token
+            )
+
+    progress.finish()
 
     if violations:
         log("⚠ Some images were rejected.")
@@ -232,3 +760,90 @@ def run_pipeline(
 
     return violations
 
+
+def _match_triggers(flights, names, corrected_times, image_usec, skip, violations, log):
+    """
+    Trigger-mode counterpart of Flights.match(): images sorted by capture
+    time (name breaks ties within the 1 s EXIF resolution) are mapped
+    onto the trigger sequence. Returns (names, corrected_times, matched,
+    values) in that order; images in skip are aligned but not matched.
+    """
+
+    # images arrive sorted by name, so a stable sort keeps it as tie-break
+    order = np.argsort(np.asarray(image_usec, dtype=np.int64), kind="stable")
+
+    names = [names[i] for i in order]
+    corrected_times = [corrected_times[i] for i in order]
+    image_usec = np.asarray(image_usec, dtype=np.int64)[order]
+
+    alignment, trigger_usec, columns = flights.match_triggers(len(names))
+
+    found = alignment.positions >= 0
+    log(f"📸 {int(found.sum())} of {len(names)} images aligned to camera triggers.")
+
+    # The camera clock only ordered the images; a drifting Δ hints at a bad order
+    residual = (image_usec[found] - trigger_usec[found]) / 1e6
+
+    if len(residual):
+        median = float(np.median(residual))
+        log(f"Camera clock vs trigger: median Δ {median:+.2f}s")
+
+        outliers = np.flatnonzero(np.abs(residual - median) > MAX_ALLOWED_DIFF)
+
+        if len(outliers):
+            first = np.flatnonzero(found)[outliers[0]]
+            log(
+                f"⚠ {len(outliers)} images differ from the median Δ by more than "
+                f"{MAX_ALLOWED_DIFF}s (first: {names[first]}) — check for missing photos."
+            )
+
+    for i, img_name in enumerate(names):
+
+        if not found[i]:
+            violations.append(f"{img_name} (Trigger #{i + 1} missing from log)")
+            log(f"❌ {img_name} rejected — Trigger #{i + 1} missing from log.")
+            continue
+
+        if img_name not in skip:
+            log(f"✔ Injected telemetry into {img_name}")
+
+    matched = found & np.array([name not in skip for name in names], dtype=bool)
+    values = {name: column[matched] for name, column in columns.items()}
+
+    return names, corrected_times, matched, values
+
+
+def _solve_clock_offset(flights, image_times, log):
+    """Fit the camera clock to the log and report it before anything is written."""
+
+    reference, events = flights.clock_reference()
+
+    fit = solve_clock_offset(
+        [clock_reading(image_time) for _, image_time in image_times],
+        reference,
+        MAX_ALLOWED_DIFF,
+        events
+    )
+
+    # Telemetry alone cannot tell sub-hour drift apart; don't guess
+    if not fit.events and fit.high_sec - fit.low_sec > 2 * MAX_ALLOWED_DIFF:
+        raise ValueError(
+            f"Camera clock offset is ambiguous: any offset from "
+            f"{format_offset(fit.low_sec)} to {format_offset(fit.high_sec)} keeps the "
+            f"images inside the flight. Pass an explicit clock offset (--clock-offset) "
+            f"or use a log with camera trigger events."
+        )
+
+    if fit.events:
+        log(
+            f"⏱ Camera clock offset {format_offset(fit.offset_sec)} "
+            f"(fitted to camera triggers, {fit.match_rate:.1%} of images match)"
+        )
+    else:
+        log(
+            f"⏱ Camera clock offset {format_offset(fit.offset_sec)} "
+            f"(fitted to telemetry, range {format_offset(fit.low_sec)} … "
+            f"{format_offset(fit.high_sec)})"
+        )
+
+    return fit.offset_sec
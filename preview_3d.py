@@ -1,8 +1,114 @@
 import pyqtgraph.opengl as gl
-from PySide6.QtGui import QVector3D
+from pyqtgraph import Transform3D
+from PySide6.QtCore import Qt, QTimer, QElapsedTimer
+from PySide6.QtGui import QPainter, QColor, QPen
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSlider, QComboBox, QLabel
+)
 import numpy as np
 
 
+DEFAULT_REFRESH_HZ = 60
+
+# Wire-frame colour of the old GLBoxItem parts
+DRONE_COLOR = (1.0, 1.0, 1.0, 80 / 255)
+
+
+# ----------------------------
+# Geometry / transforms (numpy only)
+# ----------------------------
+
+def box_edges(sx, sy, sz):
+    """12 edges of a box as 24 line-segment endpoints (GLBoxItem layout)."""
+
+    corners = np.array([
+        [0, 0, 0], [0, 0, 1], [1, 0, 0], [1, 0, 1],
+        [0, 1, 0], [0, 1, 1], [1, 1, 0], [1, 1, 1],
+        [0, 0, 0], [0, 1, 0], [1, 0, 0], [1, 1, 0],
+        [0, 0, 1], [0, 1, 1], [1, 0, 1], [1, 1, 1],
+        [0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0],
+        [0, 0, 1], [1, 0, 1], [0, 1, 1], [1, 1, 1],
+    ], dtype=np.float64)
+
+    return corners * [sx, sy, sz]
+
+
+def rotation_matrices(yaw, pitch, roll):
+    """
+    Vectorized (N, 3, 3) rotations in degrees, composed as
+    R_roll(y) · R_pitch(x) · R_yaw(z) — the order the drone parts
+    were previously rotated in.
+    """
+
+    yaw, pitch, roll = (
+        np.radians(np.atleast_1d(np.asarray(a, dtype=np.float64)))
+        for a in (yaw, pitch, roll)
+    )
+
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cr, sr = np.cos(roll), np.sin(roll)
+
+    one = np.ones_like(yaw)
+    zero = np.zeros_like(yaw)
+
+    r_yaw = np.stack([
+        np.stack([cy, -sy, zero], -1),
+        np.stack([sy, cy, zero], -1),
+        np.stack([zero, zero, one], -1),
+    ], -2)
+
+    r_pitch = np.stack([
+        np.stack([one, zero, zero], -1),
+        np.stack([zero, cp, -sp], -1),
+        np.stack([zero, sp, cp], -1),
+    ], -2)
+
+    r_roll = np.stack([
+        np.stack([cr, zero, sr], -1),
+        np.stack([zero, one, zero], -1),
+        np.stack([-sr, zero, cr], -1),
+    ], -2)
+
+    return r_roll @ r_pitch @ r_yaw
+
+
+def to_transform(rotation):
+    """3x3 rotation → pyqtgraph Transform3D (row-major 4x4)."""
+
+    m = np.eye(4)
+    m[:3, :3] = rotation
+
+    return Transform3D(*m.ravel())
+
+
+def build_drone_lines():
+    """All drone parts as one (N, 3) line-segment array, built once."""
+
+    arm_length = 4
+    arm_thickness = 0.2
+
+    segments = []
+
+    # Central body
+    segments.append(box_edges(1.4, 1.4, 0.3) + [-0.7, -0.7, 0])
+
+    # Arms
+    for angle in [45, 135, 225, 315]:
+        arm = box_edges(arm_length, arm_thickness, 0.15)
+        arm += [-arm_length / 2, -arm_thickness / 2, 0.1]
+        segments.append(arm @ rotation_matrices(angle, 0, 0)[0].T)
+
+    # Motors
+    for angle in [45, 135, 225, 315]:
+        x = (arm_length / 2) * np.cos(np.radians(angle))
+        y = (arm_length / 2) * np.sin(np.radians(angle))
+
+        segments.append(box_edges(0.5, 0.5, 0.2) + [x - 0.25, y - 0.25, 0.2])
+
+    return np.concatenate(segments).astype(np.float32)
+
+
 class OrientationWidget(gl.GLViewWidget):
 
     def __init__(self):
@@ -16,58 +122,236 @@ class OrientationWidget(gl.GLViewWidget):
         grid.scale(2, 2, 1)
         self.addItem(grid)
 
-        # Store drone parts
-        self.parts = []
+        # Single item for the whole drone: one draw call, geometry never rebuilt
+        self.drone = gl.GLLinePlotItem(
+            pos=build_drone_lines(),
+            color=DRONE_COLOR,
+            mode="lines",
+            glOptions="translucent"
+        )
+        self.addItem(self.drone)
 
-        self.build_drone()
+        # Latest requested attitude; applied at most once per display frame
+        self._pending = None
 
-    # ----------------------------
-    # Build drone once
-    # ----------------------------
-    def build_drone(self):
-
-        arm_length = 4
-        arm_thickness = 0.2
-
-        # Central body
-        body = gl.GLBoxItem(size=QVector3D(1.4, 1.4, 0.3))
-        body.translate(-0.7, -0.7, 0)
-        self.addItem(body)
-        self.parts.append(body)
-
-        # Arms
-        for angle in [45, 135, 225, 315]:
-            arm = gl.GLBoxItem(size=QVector3D(arm_length, arm_thickness, 0.15))
-            arm.translate(-arm_length/2, -arm_thickness/2, 0.1)
-            arm.rotate(angle, 0, 0, 1)
-            self.addItem(arm)
-            self.parts.append(arm)
-
-        # Motors
-        for angle in [45, 135, 225, 315]:
-            x = (arm_length/2) * np.cos(np.radians(angle))
-            y = (arm_length/2) * np.sin(np.radians(angle))
-
-            motor = gl.GLBoxItem(size=QVector3D(0.5, 0.5, 0.2))
-            motor.translate(x - 0.25, y - 0.25, 0.2)
-            self.addItem(motor)
-            self.parts.append(motor)
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setInterval(int(1000 / DEFAULT_REFRESH_HZ))
+        self._frame_timer.timeout.connect(self._apply_pending)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+
+        screen = self.screen()
+        if screen is not None and screen.refreshRate() > 0:
+            self._frame_timer.setInterval(int(1000 / screen.refreshRate()))
 
     # ----------------------------
     # Apply rotation cleanly
     # ----------------------------
     def update_orientation(self, yaw, pitch, roll):
+        """Cheap to call at any rate; only the newest value is drawn."""
+
+        self._pending = (yaw, pitch, roll)
+
+        if not self._frame_timer.isActive():
+            self._frame_timer.start()
+
+    def set_rotation(self, rotation):
+        """Apply a precomputed 3x3 rotation immediately."""
+
+        self.drone.setTransform(to_transform(rotation))
+
+    def _apply_pending(self):
+
+        if self._pending is None:
+            # Nothing new since the last frame → stop ticking
+            self._frame_timer.stop()
+            return
+
+        yaw, pitch, roll = self._pending
+        self._pending = None
+
+        self.set_rotation(rotation_matrices(yaw, pitch, roll)[0])
+
+
+# ----------------------------
+# Flight replay
+# ----------------------------
+
+REPLAY_FPS = 60
+SLIDER_STEPS = 10000
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+class TimelineMarkers(QWidget):
+    """Thin bar under the slider with one tick per image capture."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFixedHeight(10)
+        self.positions = np.empty(0)
+
+    def set_positions(self, fractions):
+        self.positions = np.asarray(fractions, dtype=np.float64)
+        self.update()
+
+    def paintEvent(self, event):
+
+        painter = QPainter(self)
+        painter.setPen(QPen(QColor("#03DAC6"), 1))
+
+        width = self.width() - 1
+        height = self.height()
+
+        # Merge ticks that land on the same pixel
+        for x in np.unique((self.positions * width).astype(int)):
+            painter.drawLine(x, 0, x, height)
+
+        painter.end()
+
+
+class FlightReplayWidget(QWidget):
+    """
+    Replays a flight's attitude on the 3D drone.
+
+    All rotation matrices are computed once in load_flight();
+    each frame only looks up an index, so cost per frame is
+    independent of log length.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self.view = OrientationWidget()
+
+        self.play_btn = QPushButton("▶")
+        self.play_btn.setFixedWidth(40)
+        self.play_btn.clicked.connect(self.toggle_play)
+
+        self.speed_box = QComboBox()
+        for speed in REPLAY_SPEEDS:
+            self.speed_box.addItem(f"{speed}×", speed)
+        self.speed_box.setCurrentIndex(REPLAY_SPEEDS.index(1))
+
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(0, SLIDER_STEPS)
+        self.slider.setEnabled(False)  # until load_flight() succeeds
+        self.slider.sliderMoved.connect(self.scrub)
+
+        self.markers = TimelineMarkers()
+        self.time_label = QLabel("--:--")
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.play_btn)
+        controls.addWidget(self.slider, 1)
+        controls.addWidget(self.time_label)
+        controls.addWidget(self.speed_box)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.view, 1)
+        layout.addLayout(controls)
+        layout.addWidget(self.markers)
+
+        self.times = np.empty(0, dtype=np.int64)
+        self.rotations = np.empty((0, 3, 3), dtype=np.float32)
+        self.start = 0.0
+        self.duration = 1.0
+        self.position_usec = 0.0
+
+        self._clock = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(1000 / REPLAY_FPS))
+        self._timer.timeout.connect(self._tick)
+
+    # ---- Data ----
+    def load_flight(self, timestamps_usec, yaw, pitch, roll, capture_usec=None):
+        """
+        timestamps_usec + yaw/pitch/roll arrays, e.g. the utc_usec and
+        angle columns from extract_telemetry(). capture_usec marks images.
+        """
+
+        self.pause()
+        self.slider.setEnabled(False)
+
+        times = np.asarray(timestamps_usec, dtype=np.int64)
+        order = np.argsort(times, kind="stable")
+
+        self.times = times[order]
+        self.rotations = rotation_matrices(
+            np.asarray(yaw)[order],
+            np.asarray(pitch)[order],
+            np.asarray(roll)[order]
+        ).astype(np.float32)
+
+        if len(self.times) == 0:
+            raise ValueError("No attitude samples to replay.")
+
+        self.start = float(self.times[0])
+        self.duration = float(max(self.times[-1] - self.times[0], 1))
+
+        if capture_usec is not None:
+            capture = np.asarray(capture_usec, dtype=np.float64)
+            self.markers.set_positions(
+                np.clip((capture - self.start) / self.duration, 0, 1)
+            )
+        else:
+            self.markers.set_positions([])
+
+        self.slider.setEnabled(True)
+        self.seek(self.start)
+
+    # ---- Playback ----
+    def toggle_play(self):
+        if self._timer.isActive():
+            self.pause()
+        else:
+            self.play()
+
+    def play(self):
+        if len(self.times) == 0:
+            return
+
+        # Restart from the beginning once the end is reached
+        if self.position_usec >= self.start + self.duration:
+            self.seek(self.start)
+
+        self._clock.start()
+        self._timer.start()
+        self.play_btn.setText("⏸")
+
+    def pause(self):
+        self._timer.stop()
+        self.play_btn.setText("▶")
+
+    def scrub(self, value):
+        self.seek(self.start + self.duration * value / SLIDER_STEPS, move_slider=False)
+
+    def seek(self, usec, move_slider=True):
+
+        if len(self.times) == 0:
+            return
+
+        end = self.start + self.duration
+        self.position_usec = min(max(usec, self.start), end)
+
+        i = np.searchsorted(self.times, self.position_usec, side="right") - 1
+        self.view.set_rotation(self.rotations[max(i, 0)])
+
+        elapsed = (self.position_usec - self.start) / 1e6
+        self.time_label.setText(f"{int(elapsed // 60):02d}:{int(elapsed % 60):02d}")
+
+        if move_slider and not self.slider.isSliderDown():
+            self.slider.setValue(
+                int((self.position_usec - self.start) / self.duration * SLIDER_STEPS)
+            )
+
+    def _tick(self):
 
-        for part in self.parts:
-            part.resetTransform()
+        # Advance by real elapsed time so speed holds even if frames drop
+        elapsed_ms = self._clock.restart()
+        speed = self.speed_box.currentData()
 
-        # Re-apply base geometry transforms
-        self.parts.clear()
-        self.items = []
-        self.clear()
-        self.build_drone()
+        self.seek(self.position_usec + elapsed_ms * 1000 * speed)
 
-        for part in self.parts:
-            part.rotate(yaw, 0, 0, 1)
-            part.rotate(pitch, 1, 0, 0)
-            part.rotate(roll, 0, 1, 0)
+        if self.position_usec >= self.start + self.duration:
+            self.pause()
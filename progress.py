@@ -0,0 +1,183 @@
+import time
+import threading
+from collections import namedtuple
+
+
+class Cancelled(Exception):
+    """Raised by a pipeline run whose CancelToken was set."""
+
+
+class CancelToken:
+    """
+    Set from any thread (e.g. a Cancel button); the pipeline checks it
+    between images and stops at the next check.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled("Processing cancelled.")
+
+
+ProgressEvent = namedtuple(
+    "ProgressEvent",
+    [
+        "stage", "done", "total", "percent",
+        "images_per_sec", "mb_per_sec", "eta_sec"
+    ]
+)
+
+# Share of the overall bar per stage (writing dominates wall time)
+PIPELINE_STAGES = {"validate": 0.15, "telemetry": 0.05, "match": 0.05, "write": 0.75}
+STREAMING_STAGES = {"telemetry": 0.05, "stream": 0.95}
+
+
+class ProgressTracker:
+    """
+    Stage-aware progress for one run.
+
+    progress_callback(percent) gets the overall 0-100 value whenever
+    it changes; status_callback(ProgressEvent) gets the current stage's
+    counts, images/s, MB/s and stage ETA, at most every min_interval
+    seconds (and always at the end of a stage).
+    """
+
+    def __init__(
+        self,
+        progress_callback=None,
+        status_callback=None,
+        stages=PIPELINE_STAGES,
+        min_interval=0.1
+    ):
+
+        self.progress_callback = progress_callback
+        self.status_callback = status_callback
+        self.min_interval = min_interval
+
+        total_weight = sum(stages.values())
+        self.weights = {name: w / total_weight for name, w in stages.items()}
+
+        self.completed = 0.0
+        self.stage_name = None
+        self.rates = True
+        self.total = 0
+        self.done = 0
+        self.nbytes = 0
+
+        self._stage_start = None
+        self._last_emit = 0.0
+        self._percent = None
+
+    def stage(self, name, total, rates=True):
+        """
+        Start a stage of `total` images (finishing the previous one).
+        rates=False for stages that are not per image (telemetry load).
+        """
+
+        if self.stage_name is not None:
+            self.finish_stage()
+
+        self.stage_name = name
+        self.total = total
+        self.done = 0
+        self.nbytes = 0
+        self.rates = rates
+        self._stage_start = time.perf_counter()
+
+        self._emit(force=True)
+
+    def advance(self, count=1, nbytes=0):
+        self.update(self.done + count, self.nbytes + nbytes)
+
+    def update(self, done, nbytes=None):
+
+        self.done = min(done, self.total)
+        if nbytes is not None:
+            self.nbytes = nbytes
+
+        self._emit(force=self.done >= self.total)
+
+    def finish_stage(self):
+
+        if self.stage_name is None:
+            return
+
+        # update() already reported a stage that ran to its total
+        if self.done < self.total:
+            self.done = self.total
+            self._emit(force=True)
+
+        self.completed += self.weights.get(self.stage_name, 0.0)
+        self.stage_name = None
+
+    def finish(self):
+        self.finish_stage()
+        self.completed = 1.0
+        self._report_percent(100)
+
+    # ---- Output ----
+    def _overall(self):
+
+        fraction = self.done / self.total if self.total else 0.0
+        current = self.weights.get(self.stage_name, 0.0) * fraction
+
+        return int(min(self.completed + current, 1.0) * 100)
+
+    def _report_percent(self, percent):
+
+        if percent != self._percent:
+            self._percent = percent
+            if self.progress_callback:
+                self.progress_callback(percent)
+
+    def _emit(self, force=False):
+
+        self._report_percent(self._overall())
+
+        if not self.status_callback:
+            return
+
+        now = time.perf_counter()
+        if not force and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+
+        elapsed = now - self._stage_start
+        rate = self.done / elapsed if self.rates and elapsed > 0 and self.done else None
+        mb_rate = self.nbytes / 1e6 / elapsed if elapsed > 0 and self.nbytes else None
+        eta = (self.total - self.done) / rate if rate else None
+
+        self.status_callback(ProgressEvent(
+            self.stage_name,
+            self.done,
+            self.total,
+            self._percent,
+            round(rate, 1) if rate else None,
+            round(mb_rate, 1) if mb_rate else None,
+            round(eta, 1) if eta is not None else None,
+        ))
+
+
+def format_event(event):
+    """One status-bar line, e.g. 'write 1200/5000 · 85.0 img/s · 110.2 MB/s · ETA 0:45'."""
+
+    parts = [f"{event.stage} {event.done}/{event.total}"]
+
+    if event.images_per_sec:
+        parts.append(f"{event.images_per_sec:.1f} img/s")
+    if event.mb_per_sec:
+        parts.append(f"{event.mb_per_sec:.1f} MB/s")
+    if event.eta_sec is not None and event.done < event.total:
+        minutes, seconds = divmod(int(event.eta_sec), 60)
+        parts.append(f"ETA {minutes}:{seconds:02d}")
+
+    return " · ".join(parts)
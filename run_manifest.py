@@ -0,0 +1,259 @@
+import os
+import json
+import hashlib
+import threading
+
+
+MANIFEST_NAME = ".geotagger_manifest.jsonl"
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha1(path):
+
+    h = hashlib.sha1()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def run_key(
+    ulg_path, apply_offset, interpolate, mode="splice", match="time", clock_offset=None
+):
+    """Settings that, if changed, invalidate every manifest entry."""
+
+    # Imported here: telemetry_cache pulls in pyulog/pandas
+    from telemetry_cache import fingerprint
+    from flight_index import list_logs
+
+    # A folder of logs: adding or replacing a log can re-route images
+    return {
+        "ulg": [fingerprint(path) for path in list_logs(ulg_path)],
+        "apply_offset": bool(apply_offset),
+        "interpolate": bool(interpolate),
+        "mode": mode,
+        "match": match,
+        "clock_offset": clock_offset,
+    }
+
+
+class _Entry:
+    """What is_done() needs per image; the full JSON line stays on disk."""
+
+    __slots__ = ("size", "mtime_ns", "sha1", "output_size", "output_mtime_ns", "offset")
+
+    def __init__(self, data, offset):
+        self.size = data["size"]
+        self.mtime_ns = data["mtime_ns"]
+        self.sha1 = data["sha1"]
+        self.output_size = data["output_size"]
+        self.output_mtime_ns = data["output_mtime_ns"]
+        self.offset = offset
+
+
+class RunManifest:
+    """
+    Per-output-folder record of tagged images, so a re-run only
+    processes new or changed ones.
+
+    JSON Lines: a header with the run key (ULog fingerprint + settings),
+    then one entry per written image, appended and flushed as soon as
+    the write finishes — a crash loses at most the line being written.
+    The newest entry per image wins; close() compacts the file.
+
+    Only a small slotted _Entry (stat fields, hash, line offset) is kept
+    in memory per image; telemetry and paths are read back from the file
+    when needed.
+
+    An image is skipped when its source size + mtime match (or, if
+    only the mtime changed, its content hash does) and the output file
+    is still the one that was written.
+    """
+
+    def __init__(self, output_folder, key, resume=True, log_callback=None):
+
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.run_key = dict(key, version=MANIFEST_VERSION)
+        self.entries = {}
+        self._lock = threading.Lock()
+
+        def log(msg):
+            if log_callback:
+                log_callback(msg)
+
+        os.makedirs(output_folder, exist_ok=True)
+
+        if resume and os.path.exists(self.path):
+            header = self._read()
+
+            if header != self.run_key:
+                self.entries = {}
+                if header is not None:
+                    log("⚠ ULog or settings changed since the last run — reprocessing all images.")
+
+        # Rewrite so the file starts with the current header
+        self._compact()
+
+        self._file = open(self.path, "ab")
+        self._file.seek(0, os.SEEK_END)
+
+    # ---- Lookup ----
+    def is_done(self, img_name, source_path):
+
+        entry = self.entries.get(img_name)
+
+        if entry is None:
+            return False
+
+        try:
+            source = os.stat(source_path)
+            output = os.stat(os.path.join(self.output_folder, img_name))
+        except OSError:
+            return False
+
+        # Output deleted or edited since we wrote it
+        if (output.st_size, output.st_mtime_ns) != (
+            entry.output_size, entry.output_mtime_ns
+        ):
+            return False
+
+        if source.st_size != entry.size:
+            return False
+
+        if source.st_mtime_ns == entry.mtime_ns:
+            return True
+
+        # Touched (copied, synced) but maybe not changed
+        if file_sha1(source_path) != entry.sha1:
+            return False
+
+        self._append(dict(self._line_at(entry.offset), mtime_ns=source.st_mtime_ns))
+
+        return True
+
+    def pending(self, image_folder, images):
+        """Split names into (pending, done)."""
+
+        pending, done = [], []
+
+        for img_name in images:
+            if self.is_done(img_name, os.path.join(image_folder, img_name)):
+                done.append(img_name)
+            else:
+                pending.append(img_name)
+
+        return pending, done
+
+    # ---- Recording ----
+    def record(self, source_path, output_path, record, result):
+        """Add one successful image_writer.WriteResult."""
+
+        source = os.stat(source_path)
+        output = os.stat(output_path)
+
+        # Updated in place: the source now is the tagged file
+        in_place = os.path.abspath(source_path) == os.path.abspath(output_path)
+
+        self._append({
+            "image": result.image,
+            "source": os.path.abspath(source_path),
+            "size": source.st_size,
+            "mtime_ns": source.st_mtime_ns,
+            "sha1": result.output_sha1 if in_place else result.source_sha1,
+            "telemetry": {
+                key: value for key, value in record.items() if key != "image"
+            },
+            "output": os.path.abspath(output_path),
+            "output_size": output.st_size,
+            "output_mtime_ns": output.st_mtime_ns,
+            "output_sha1": result.output_sha1,
+        })
+
+    def close(self):
+
+        with self._lock:
+            if self._file.closed:
+                return
+
+            self._file.close()
+            self._compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- File ----
+    def _append(self, data):
+
+        line = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+        # Validator thread and writer loop may both append (streaming)
+        with self._lock:
+            if self._file.closed:
+                return
+
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+
+            self.entries[data["image"]] = _Entry(data, offset)
+
+    def _line_at(self, offset):
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _read(self):
+        """Load entries (newest line per image wins); returns the header."""
+
+        header = None
+        offset = 0
+
+        with open(self.path, "rb") as f:
+            for i, line in enumerate(f):
+
+                start = offset
+                offset += len(line)
+
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    # Partial last line from an interrupted run
+                    continue
+
+                if i == 0:
+                    header = data
+                elif isinstance(data, dict) and "image" in data:
+                    self.entries[data["image"]] = _Entry(data, start)
+
+        return header
+
+    def _compact(self):
+        """Rewrite as header + newest line per image, in one sequential pass."""
+
+        tmp = self.path + ".tmp"
+        latest = {entry.offset: entry for entry in self.entries.values()}
+
+        with open(tmp, "wb") as dst:
+            dst.write((json.dumps(self.run_key) + "\n").encode("utf-8"))
+
+            if latest:
+                offset = 0
+
+                with open(self.path, "rb") as src:
+                    for line in src:
+                        entry = latest.get(offset)
+                        offset += len(line)
+
+                        if entry is not None and line.endswith(b"\n"):
+                            entry.offset = dst.tell()
+                            dst.write(line)
+
+        os.replace(tmp, self.path)
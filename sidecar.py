@@ -0,0 +1,235 @@
+import os
+import time
+
+from image_writer import WriteResult
+
+
+# Output formats that leave the JPEGs untouched
+SIDECAR_FORMATS = ("geotxt", "csv", "xmp")
+
+GEO_TXT = "geo.txt"
+GEO_CSV = "geotags.csv"
+
+CSV_COLUMNS = ["image", "lat", "lon", "alt", "yaw", "pitch", "roll", "corrected_time"]
+
+XMP_TEMPLATE = """<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about=""
+    xmlns:exif="http://ns.adobe.com/exif/1.0/"
+    xmlns:Camera="http://pix4d.com/camera/1.0/"
+    exif:GPSLatitude="{lat}"
+    exif:GPSLongitude="{lon}"
+    exif:GPSAltitude="{alt}"
+    exif:GPSAltitudeRef="{alt_ref}"
+    exif:DateTimeOriginal="{time}"
+    Camera:Yaw="{yaw:.4f}"
+    Camera:Pitch="{pitch:.4f}"
+    Camera:Roll="{roll:.4f}"/>
+ </rdf:RDF>
+</x:xmpmeta>
+<?xpacket end="w"?>
+"""
+
+
+class SidecarWriter:
+    """
+    Geotags of matched images without rewriting the JPEGs.
+
+    fmt="geotxt" → one OpenDroneMap geo.txt (EPSG:4326, lon lat alt yaw pitch roll)
+    fmt="csv"    → one geotags.csv (Pix4D / Metashape reference import)
+    fmt="xmp"    → <image>.xmp next to where the tagged JPEG would go
+
+    Lines are written as records arrive (one sequential pass). The single
+    file is written under a temporary name and renamed by close(); a run
+    that fails or is cancelled leaves the previous file in place.
+    """
+
+    def __init__(self, output_folder, fmt):
+
+        if fmt not in SIDECAR_FORMATS:
+            raise ValueError(f"Unknown sidecar format: {fmt}")
+
+        os.makedirs(output_folder, exist_ok=True)
+
+        self.output_folder = output_folder
+        self.fmt = fmt
+        self.path = None
+        self._file = None
+
+        if fmt == "xmp":
+            return
+
+        self.path = os.path.join(output_folder, GEO_TXT if fmt == "geotxt" else GEO_CSV)
+        self._file = open(self.path + ".part", "w", encoding="utf-8", newline="")
+
+        if fmt == "geotxt":
+            self._file.write("EPSG:4326\n")
+        else:
+            self._file.write(",".join(CSV_COLUMNS) + "\n")
+
+    def write(self, record):
+        """Add one matched record; returns the bytes written."""
+
+        if self.fmt == "xmp":
+            return self._write_xmp(record)
+
+        if self.fmt == "geotxt":
+            line = (
+                f"{record['image']} {record['lon']:.8f} {record['lat']:.8f} "
+                f"{record['alt']:.3f} {record['yaw']:.4f} {record['pitch']:.4f} "
+                f"{record['roll']:.4f}\n"
+            )
+        else:
+            line = (
+                f"{_csv_field(record['image'])},{record['lat']:.8f},{record['lon']:.8f},"
+                f"{record['alt']:.3f},{record['yaw']:.4f},{record['pitch']:.4f},"
+                f"{record['roll']:.4f},{record.get('corrected_time', '')}\n"
+            )
+
+        self._file.write(line)
+
+        return len(line)
+
+    def close(self):
+
+        if self._file is None or self._file.closed:
+            return
+
+        self._file.close()
+        os.replace(self.path + ".part", self.path)
+
+    def discard(self):
+
+        if self._file is None or self._file.closed:
+            return
+
+        self._file.close()
+
+        try:
+            os.remove(self.path + ".part")
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _write_xmp(self, record):
+
+        lat, lon, alt = record["lat"], record["lon"], record["alt"]
+
+        data = XMP_TEMPLATE.format(
+            lat=_xmp_coord(lat, "N" if lat >= 0 else "S"),
+            lon=_xmp_coord(lon, "E" if lon >= 0 else "W"),
+            alt=f"{int(round(abs(alt) * 100))}/100",
+            alt_ref=0 if alt >= 0 else 1,
+            time=_xmp_time(record.get("corrected_time")),
+            yaw=record["yaw"],
+            pitch=record["pitch"],
+            roll=record["roll"],
+        ).encode("utf-8")
+
+        path = os.path.join(
+            self.output_folder, os.path.splitext(record["image"])[0] + ".xmp"
+        )
+
+        tmp = path + ".part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        return len(data)
+
+
+def write_sidecars(
+    records,
+    output_folder,
+    fmt,
+    result_callback=None,
+    stats=None,
+    progress=None,
+    cancel_token=None
+):
+    """
+    write_metadata() counterpart for sidecar formats: same callbacks,
+    returns the list of (img_name, error) failures.
+    """
+
+    failures = []
+
+    with SidecarWriter(output_folder, fmt) as writer:
+        for result in write_stream(records, writer):
+
+            if stats:
+                stats.image("write", result.seconds)
+                stats.add("bytes_written", result.bytes_written)
+
+            if result.error is not None:
+                failures.append((result.image, result.error))
+
+            if result_callback:
+                result_callback(result.image, result.error)
+
+            if progress:
+                progress.advance(1, result.bytes_written)
+
+            if cancel_token:
+                cancel_token.check()
+
+    return failures
+
+
+def write_stream(records, writer):
+    """Write records in order, yielding an image_writer.WriteResult per record."""
+
+    for record in records:
+
+        start = time.perf_counter()
+
+        try:
+            size = writer.write(record)
+        except (OSError, KeyError, ValueError) as e:
+            yield WriteResult(
+                record["image"], str(e), time.perf_counter() - start, 0, 0, None, None
+            )
+            continue
+
+        yield WriteResult(
+            record["image"], None, time.perf_counter() - start, 0, size, None, None
+        )
+
+
+def _csv_field(value):
+
+    value = str(value)
+
+    if any(c in value for c in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+
+    return value
+
+
+def _xmp_coord(value, ref):
+    """XMP GPSCoordinate: 'DDD,MM.mmmmmmR'."""
+
+    value = abs(value)
+    deg = int(value)
+
+    return f"{deg},{(value - deg) * 60:.6f}{ref}"
+
+
+def _xmp_time(corrected_time):
+    """EXIF 'YYYY:MM:DD HH:MM:SS' → XMP 'YYYY-MM-DDTHH:MM:SS'."""
+
+    if not corrected_time:
+        return ""
+
+    date, _, clock = corrected_time.partition(" ")
+
+    return f"{date.replace(':', '-')}T{clock}"
@@ -0,0 +1,409 @@
+import os
+import queue
+import threading
+import numpy as np
+
+from pipeline import (
+    iter_images, exif_source, validate_image, correct_time, check_clock_offset,
+    Flights, OUTPUT_FORMATS, write_target
+)
+from telemetry_cache import DEFAULT_CACHE_DIR
+from image_writer import write_stream, record_write, backup_path, WriteTask
+from exif_encoder import encode_gps, valid_blocks
+from sidecar import SidecarWriter, write_stream as write_sidecar_stream
+from instrumentation import RunStats
+from run_manifest import RunManifest, run_key
+from progress import ProgressTracker, Cancelled, STREAMING_STAGES
+
+
+_DONE = object()
+
+
+def run_streaming_pipeline(
+    image_folder,
+    ulg_path,
+    output_folder,
+    apply_offset,
+    progress_callback=None,
+    log_callback=None,
+    workers=None,
+    cache_dir=DEFAULT_CACHE_DIR,
+    interpolate=True,
+    queue_size=256,
+    batch_size=64,
+    stats_callback=None,
+    profile=False,
+    profile_path=None,
+    trace_memory=False,
+    resume=True,
+    status_callback=None,
+    cancel_token=None,
+    output_format="exif",
+    in_place=False,
+    backup=True,
+    match_mode="time",
+    clock_offset=None
+):
+    """
+    scan → validate → match → write as overlapping stages.
+
+    Unlike run_pipeline, an invalid image does not abort the run:
+    it is reported as a violation and skipped while the rest are written.
+    Memory is bounded by queue_size and batch_size, not by image count.
+
+    Stages overlap, so the "stream" phase covers validate + match + write;
+    per-image validate/write timings are still recorded separately.
+    resume, status_callback, cancel_token, output_format, in_place and
+    backup work as in run_pipeline.
+
+    Only match_mode="time" streams: trigger alignment needs every image
+    in capture order before the first one can be matched. Likewise
+    clock_offset takes a number of seconds here, not "auto".
+    """
+
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    if match_mode != "time":
+        raise ValueError("Trigger matching needs the full image list — run without streaming.")
+
+    if clock_offset == "auto":
+        raise ValueError("Clock offset solving needs every image time — run without streaming.")
+
+    check_clock_offset(clock_offset)
+
+    output_folder, backup_dir = write_target(
+        image_folder, output_folder, output_format, in_place, backup
+    )
+
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    stats = RunStats(profile, profile_path, trace_memory)
+    stats.start()
+
+    progress = ProgressTracker(progress_callback, status_callback, STREAMING_STAGES)
+    manifest = None
+
+    try:
+        if output_format == "exif":
+            manifest = RunManifest(
+                output_folder,
+                run_key(ulg_path, apply_offset, interpolate, clock_offset=clock_offset),
+                resume,
+                log
+            )
+
+        return _run_streaming(
+            image_folder,
+            ulg_path,
+            output_folder,
+            apply_offset,
+            progress,
+            cancel_token,
+            log,
+            workers,
+            cache_dir,
+            interpolate,
+            queue_size,
+            batch_size,
+            stats,
+            manifest,
+            output_format,
+            backup_dir,
+            clock_offset
+        )
+    finally:
+        if manifest:
+            manifest.close()
+        stats.stop()
+        if stats_callback:
+            stats_callback(stats.summary())
+
+
+def _run_streaming(
+    image_folder,
+    ulg_path,
+    output_folder,
+    apply_offset,
+    progress,
+    cancel_token,
+    log,
+    workers,
+    cache_dir,
+    interpolate,
+    queue_size,
+    batch_size,
+    stats,
+    manifest,
+    output_format,
+    backup_dir,
+    clock_offset
+):
+
+    # Counting only (no list kept) so progress has a denominator
+    total = sum(1 for _ in iter_images(image_folder))
+
+    if not total:
+        raise ValueError("No JPG images found.")
+
+    stats.add("images_total", total)
+
+    def cancelled():
+        return cancel_token is not None and cancel_token.cancelled
+
+    # Set when the writer side stops, so the validator never blocks on a full queue
+    stop = threading.Event()
+
+    def stopping():
+        return stop.is_set() or cancelled()
+
+    progress.stage("telemetry", 1, rates=False)
+
+    with stats.phase("telemetry"):
+        flights = Flights(ulg_path, cache_dir, interpolate, log)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    if backup_dir:
+        os.makedirs(backup_dir, exist_ok=True)
+
+    violations = []
+    validated = queue.Queue(maxsize=queue_size)
+    failure = []
+    skipped = [0]  # count only: no per-image state for already-tagged images
+
+    # Telemetry of images handed to the writer, for the run manifest
+    in_flight = {}
+
+    def reject(img_name, reason, message):
+        violations.append(f"{img_name} ({reason})")
+        log(message)
+
+    # ----------------------------------------
+    # STAGE 1+2 — SCAN / VALIDATE (thread)
+    # ----------------------------------------
+
+    def validate_stage():
+        try:
+            for img_name in iter_images(image_folder):
+
+                if stopping():
+                    break
+
+                img_path = os.path.join(image_folder, img_name)
+
+                # Tagged by an earlier (possibly interrupted) run
+                if manifest and manifest.is_done(img_name, img_path):
+                    skipped[0] += 1
+                    continue
+
+                image_time, problem = validate_image(
+                    exif_source(image_folder, img_name, backup_dir), stats
+                )
+
+                if problem:
+                    reason, message = problem
+                    reject(img_name, reason, f"⚠ {img_name} {message}")
+                    continue
+
+                usec, corrected = correct_time(image_time, apply_offset, clock_offset)
+
+                if usec is None:
+                    reject(
+                        img_name,
+                        "Timestamp conversion failed - Invalid EXIF date",
+                        f"⚠ {img_name} timestamp conversion failed."
+                    )
+                    continue
+
+                if not _put(validated, (img_name, usec, corrected), stopping):
+                    break
+
+        except Exception as e:
+            failure.append(e)
+
+        finally:
+            _put(validated, _DONE, stopping)
+
+    # ----------------------------------------
+    # STAGE 3 — MATCH (batched, vectorized)
+    # ----------------------------------------
+
+    def match_stage():
+        for batch in _drain(validated, batch_size):
+
+            names = [name for name, _, _ in batch]
+            usec = np.array([u for _, u, _ in batch], dtype=np.int64)
+
+            diff_sec, in_window, matched, values = flights.match(usec)
+            matched_pos = np.flatnonzero(matched)
+
+            for i, img_name in enumerate(names):
+                if not in_window[i]:
+                    reject(
+                        img_name,
+                        "Outside flight time window",
+                        f"❌ {img_name} rejected — Outside telemetry flight window."
+                    )
+                elif not matched[i]:
+                    reject(
+                        img_name,
+                        f"No matching telemetry. Δ {diff_sec[i]:.2f}s",
+                        f"❌ {img_name} rejected — Time mismatch {diff_sec[i]:.2f}s."
+                    )
+
+            # GPS rationals for the whole batch in one step
+            blocks = encode_gps(values["lat"], values["lon"], values["alt"])
+            valid = valid_blocks(blocks)
+
+            for j, i in enumerate(matched_pos):
+                record = {name: float(column[j]) for name, column in values.items()}
+                record["image"] = names[i]
+                record["corrected_time"] = batch[i][2]
+
+                if manifest:
+                    in_flight[names[i]] = record
+
+                yield WriteTask(
+                    os.path.join(image_folder, names[i]),
+                    os.path.join(output_folder, names[i]),
+                    record,
+                    "splice",
+                    backup_path(backup_dir, names[i]) if backup_dir else None,
+                    blocks[j].tobytes() if valid[j] else None
+                )
+
+    # ----------------------------------------
+    # STAGE 4 — WRITE (process pool, bounded)
+    # ----------------------------------------
+
+    log("Streaming validate → match → write...")
+
+    thread = threading.Thread(target=validate_stage, daemon=True)
+    thread.start()
+
+    written = 0
+    bytes_written = 0
+
+    progress.stage("stream", total)
+
+    if output_format == "exif":
+        writer = None
+        results = write_stream(match_stage(), workers)
+    else:
+        # Sidecars are a few bytes per image: written inline, no pool
+        writer = SidecarWriter(output_folder, output_format)
+        results = write_sidecar_stream((task.record for task in match_stage()), writer)
+
+    with stats.phase("stream"):
+        try:
+            for result in results:
+
+                record_write(stats, result)
+                record = in_flight.pop(result.image, None)
+
+                if result.error is None:
+                    written += 1
+                    if manifest:
+                        manifest.record(
+                            os.path.join(image_folder, result.image),
+                            os.path.join(output_folder, result.image),
+                            record,
+                            result
+                        )
+                    log(f"✔ Injected telemetry into {result.image}")
+                else:
+                    reject(
+                        result.image,
+                        f"Write failed: {result.error}",
+                        f"❌ {result.image} write failed — {result.error}"
+                    )
+
+                bytes_written += result.bytes_written
+                progress.update(written + len(violations) + skipped[0], bytes_written)
+
+                if cancelled():
+                    break
+        except BaseException:
+            if writer:
+                writer.discard()
+            raise
+        finally:
+            # Stop feeding the pool; batches already running still finish
+            results.close()
+            stop.set()
+            thread.join()
+
+        # Keep the previous sidecar if this one is incomplete
+        if writer:
+            if failure or cancelled():
+                writer.discard()
+            else:
+                writer.close()
+
+    stats.add("images_written", written)
+
+    if skipped[0]:
+        stats.add("images_skipped", skipped[0])
+        log(f"✔ {skipped[0]} images already tagged and unchanged — skipped.")
+
+    if failure:
+        raise failure[0]
+
+    if cancelled():
+        if manifest:
+            log(f"⏹ Cancelled — {written} images written; re-run to resume.")
+        else:
+            log("⏹ Cancelled — no sidecar written.")
+        raise Cancelled("Processing cancelled.")
+
+    progress.finish()
+
+    if not written and not skipped[0]:
+        log("❌ No valid images matched telemetry.")
+        return violations if violations else ["No valid images matched telemetry."]
+
+    if violations:
+        log("⚠ Some images were rejected.")
+    else:
+        log("Processing completed successfully.")
+
+    return violations
+
+
+def _put(q, item, stopping):
+    """Blocking put that gives up once stopping() is true."""
+
+    while True:
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            if stopping():
+                return False
+
+
+def _drain(q, batch_size):
+    """Yield lists of up to batch_size items until the _DONE marker."""
+
+    while True:
+        batch = [q.get()]
+
+        # Grab whatever is already queued without waiting for a full batch
+        while batch[-1] is not _DONE and len(batch) < batch_size:
+            try:
+                batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+
+        done = batch[-1] is _DONE
+        if done:
+            batch.pop()
+
+        if batch:
+            yield batch
+
+        if done:
+            return
@@ -1,17 +1,14 @@
 import numpy as np
 import pandas as pd
 
+from attitude import quaternion_to_euler
+from interpolation import Trajectory
 
-def quaternion_to_euler(q0, q1, q2, q3):
 
-    yaw = np.arctan2(2*(q0*q3+q1*q2), 1-2*(q2*q2+q3*q3))
-    pitch = np.arcsin(2*(q0*q2-q3*q1))
-    roll = np.arctan2(2*(q0*q1+q2*q3), 1-2*(q1*q1+q2*q2))
+def merge_and_sample(gps_df, att_df, interval, interpolate=False):
 
-    return np.degrees(yaw), np.degrees(pitch), np.degrees(roll)
-
-
-def merge_and_sample(gps_df, att_df, interval):
+    if interpolate:
+        return _interpolate_and_sample(gps_df, att_df, interval)
 
     gps_df["utc"] = pd.to_datetime(gps_df["utc_usec"], unit="us")
 
@@ -22,7 +19,7 @@ def merge_and_sample(gps_df, att_df, interval):
     )
 
     yaw, pitch, roll = quaternion_to_euler(
-        df["q0"], df["q1"], df["q2"], df["q3"]
+        df[["q0", "q1", "q2", "q3"]].to_numpy()
     )
 
     df["yaw"] = yaw
@@ -41,3 +38,20 @@ def merge_and_sample(gps_df, att_df, interval):
     )
 
     return sampled
+
+
+def _interpolate_and_sample(gps_df, att_df, interval):
+
+    trajectory = Trajectory(gps_df, att_df)
+
+    sample_usec = np.arange(
+        trajectory.start,
+        trajectory.end + 1,
+        int(interval * 1e6),
+        dtype=np.int64
+    )
+
+    sampled = pd.DataFrame(trajectory.sample(sample_usec))
+    sampled.insert(0, "utc", pd.to_datetime(sample_usec, unit="us"))
+
+    return sampled
@@ -0,0 +1,171 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+from ulog_reader import extract_streams, merge_streams, TELEMETRY_TOPICS
+
+
+# Bump when the extracted columns or their meaning change
+CACHE_VERSION = 4
+
+HASH_CHUNK = 1024 * 1024
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = (
+        os.environ.get("LOCALAPPDATA")
+        or os.environ.get("XDG_CACHE_HOME")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(base, "GeoTaggerPro", "telemetry")
+
+
+DEFAULT_CACHE_DIR = default_cache_dir()
+
+
+def fingerprint(ulg_path, topics=TELEMETRY_TOPICS):
+    """
+    Cache key: file size + mtime + hash of the first and last MB.
+
+    Hashing the head and tail keeps the key cheap on 800 MB logs
+    while still catching a re-exported or truncated file.
+    """
+
+    stat = os.stat(ulg_path)
+
+    h = hashlib.sha1()
+    h.update(f"v{CACHE_VERSION}|{stat.st_size}|{stat.st_mtime_ns}|".encode())
+    h.update(",".join(topics or ["*"]).encode())
+
+    with open(ulg_path, "rb") as f:
+        h.update(f.read(HASH_CHUNK))
+        if stat.st_size > 2 * HASH_CHUNK:
+            f.seek(-HASH_CHUNK, os.SEEK_END)
+        h.update(f.read(HASH_CHUNK))
+
+    return h.hexdigest()
+
+
+def load_streams(
+    ulg_path,
+    cache_dir=None,
+    topics=TELEMETRY_TOPICS,
+    max_cache_bytes=MAX_CACHE_BYTES,
+    log_callback=None
+):
+    """
+    extract_streams() with a persistent columnar cache.
+    cache_dir=None disables the cache.
+    """
+
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+
+    if cache_dir is None:
+        return extract_streams(ulg_path, topics, log_callback)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        log(f"⚠ Telemetry cache unavailable ({e}), parsing without it.")
+        return extract_streams(ulg_path, topics, log_callback)
+
+    cache_path = os.path.join(cache_dir, fingerprint(ulg_path, topics) + ".npz")
+
+    if os.path.isfile(cache_path):
+        try:
+            streams = _read(cache_path)
+            # Refresh mtime so eviction is least-recently-used
+            os.utime(cache_path)
+            log("⚡ Telemetry loaded from cache.")
+            return streams
+        except Exception:
+            log("⚠ Telemetry cache entry is corrupt, re-parsing ULog.")
+
+    streams = extract_streams(ulg_path, topics, log_callback)
+
+    try:
+        _write(cache_path, streams)
+        evict(cache_dir, max_cache_bytes, keep=cache_path)
+    except OSError as e:
+        log(f"⚠ Could not write telemetry cache: {e}")
+
+    return streams
+
+
+def load_telemetry(
+    ulg_path,
+    cache_dir=None,
+    topics=TELEMETRY_TOPICS,
+    max_cache_bytes=MAX_CACHE_BYTES,
+    log_callback=None
+):
+    """extract_telemetry() with a persistent columnar cache."""
+
+    gps_df, att_df, _ = load_streams(
+        ulg_path, cache_dir, topics, max_cache_bytes, log_callback
+    )
+
+    return merge_streams(gps_df, att_df)
+
+
+def evict(cache_dir, max_cache_bytes, keep=None):
+    """Delete least-recently-used entries until the cache fits."""
+
+    entries = []
+
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".npz"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+
+    for _, size, path in sorted(entries):
+
+        if total <= max_cache_bytes:
+            break
+
+        if path == keep:
+            continue
+
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+STREAMS = ("gps", "att", "trig")
+
+
+def _write(cache_path, streams):
+
+    tmp_path = cache_path + ".tmp"
+
+    # Uncompressed npz: one raw array per column, memcpy-speed to load
+    arrays = {
+        f"{stream}.{name}": df[name].to_numpy()
+        for stream, df in zip(STREAMS, streams)
+        for name in df.columns
+    }
+
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+
+    os.replace(tmp_path, cache_path)
+
+
+def _read(cache_path):
+
+    with np.load(cache_path, allow_pickle=False) as data:
+        columns = {stream: {} for stream in STREAMS}
+
+        for key in data.files:
+            stream, name = key.split(".", 1)
+            columns[stream][name] = data[key]
+
+    return tuple(pd.DataFrame(columns[stream]) for stream in STREAMS)
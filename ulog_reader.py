@@ -1,27 +1,92 @@
+import sys
+import time
+import tracemalloc
 from pyulog import ULog
 import pandas as pd
 import numpy as np
 
+from attitude import normalize_quaternions, quaternion_to_euler
 
-def quaternion_to_euler(q0, q1, q2, q3):
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
-    sinr_cosp = 2 * (q0 * q1 + q2 * q3)
-    cosr_cosp = 1 - 2 * (q1 * q1 + q2 * q2)
-    roll = np.degrees(np.arctan2(sinr_cosp, cosr_cosp))
 
-    sinp = 2 * (q0 * q2 - q3 * q1)
-    pitch = np.degrees(np.arcsin(np.clip(sinp, -1.0, 1.0)))
+# Camera events, in order of preference: camera_capture is confirmed by
+# hot-shoe feedback, camera_trigger is the command sent to the camera
+CAMERA_TOPICS = ["camera_capture", "camera_trigger"]
 
-    siny_cosp = 2 * (q0 * q3 + q1 * q2)
-    cosy_cosp = 1 - 2 * (q2 * q2 + q3 * q3)
-    yaw = np.degrees(np.arctan2(siny_cosp, cosy_cosp))
+# Only these topics are parsed; everything else in the log is skipped
+TELEMETRY_TOPICS = ["vehicle_gps_position", "vehicle_attitude"] + CAMERA_TOPICS
 
-    return yaw, pitch, roll
 
+def load_ulog(ulg_path, topics=None, log_callback=None, trace_memory=False):
+    """
+    Parse a ULog restricted to `topics` (None → all topics).
 
-def extract_telemetry(ulg_path):
+    Reports parse time and the growth of the process peak RSS through
+    log_callback (free; not available on Windows). trace_memory=True
+    parses under tracemalloc for the peak Python memory instead, which
+    makes the parse several times slower; it is skipped when a trace is
+    already running, since tracemalloc is process-wide.
+    """
 
-    ulog = ULog(ulg_path)
+    traced = trace_memory and not tracemalloc.is_tracing()
+    if traced:
+        tracemalloc.start()
+
+    rss_before = _peak_rss()
+    start = time.perf_counter()
+
+    try:
+        ulog = ULog(ulg_path, message_name_filter_list=topics)
+    finally:
+        elapsed = time.perf_counter() - start
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    if log_callback:
+        if traced:
+            memory = f"peak Python memory {peak / 1e6:.1f} MB, traced, "
+        elif rss_before is not None:
+            memory = f"peak RSS +{(_peak_rss() - rss_before) / 1e6:.1f} MB, "
+        else:
+            memory = ""
+
+        log_callback(
+            f"ULog parsed in {elapsed:.2f}s "
+            f"({memory}topics: {', '.join(topics) if topics else 'all'})"
+        )
+
+    return ulog
+
+
+def _peak_rss():
+    """Process peak resident set size in bytes, None where unsupported."""
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # kB on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def extract_streams(ulg_path, topics=TELEMETRY_TOPICS, log_callback=None, trace_memory=False):
+    """
+    Raw GPS, full-rate attitude and camera trigger tables, each sorted
+    by timestamp.
+
+    att_df keeps the normalized quaternion (q0..q3) next to yaw/pitch/roll
+    so interpolation can SLERP between samples. trig_df is empty when the
+    log has no camera topic (see camera_events). trace_memory as in
+    load_ulog().
+    """
+
+    ulog = load_ulog(ulg_path, topics, log_callback, trace_memory)
 
     gps = ulog.get_dataset("vehicle_gps_position").data
     att = ulog.get_dataset("vehicle_attitude").data
@@ -34,38 +99,88 @@ def extract_telemetry(ulg_path):
         "alt": gps["altitude_msl_m"]
     })
 
+    q = normalize_quaternions(
+        np.column_stack([att["q[0]"], att["q[1]"], att["q[2]"], att["q[3]"]])
+    )
+
+    yaw, pitch, roll = quaternion_to_euler(q)
+
     att_df = pd.DataFrame({
         "timestamp": att["timestamp"],
-        "q0": att["q[0]"],
-        "q1": att["q[1]"],
-        "q2": att["q[2]"],
-        "q3": att["q[3]"]
+        "q0": q[:, 0],
+        "q1": q[:, 1],
+        "q2": q[:, 2],
+        "q3": q[:, 3],
+        "yaw": yaw,
+        "pitch": pitch,
+        "roll": roll
     })
 
-    yaw_list = []
-    pitch_list = []
-    roll_list = []
+    gps_df = gps_df.sort_values("timestamp").reset_index(drop=True)
+    att_df = att_df.sort_values("timestamp").reset_index(drop=True)
 
-    for _, row in att_df.iterrows():
-        yaw, pitch, roll = quaternion_to_euler(
-            row["q0"], row["q1"], row["q2"], row["q3"]
-        )
-        yaw_list.append(yaw)
-        pitch_list.append(pitch)
-        roll_list.append(roll)
+    trig_df = camera_events(ulog, gps_df, log_callback)
 
-    att_df["yaw"] = yaw_list
-    att_df["pitch"] = pitch_list
-    att_df["roll"] = roll_list
+    return gps_df, att_df, trig_df
 
-    att_df = att_df[["timestamp", "yaw", "pitch", "roll"]]
 
-    gps_df = gps_df.sort_values("timestamp")
-    att_df = att_df.sort_values("timestamp")
+def camera_events(ulog, gps_df, log_callback=None):
+    """
+    (timestamp, utc_usec, seq) of every camera trigger, from the first of
+    CAMERA_TOPICS present in the log.
+
+    utc_usec maps the boot timestamp onto GPS time through the GPS
+    samples' UTC - boot offset (held constant outside the GPS range).
+    """
+
+    for topic in CAMERA_TOPICS:
+        try:
+            data = ulog.get_dataset(topic).data
+        except (IndexError, KeyError):
+            continue
+
+        keep = np.ones(len(data["timestamp"]), dtype=bool)
+
+        # camera_capture: 0 = capture reported as failed
+        if "result" in data:
+            keep = data["result"] != 0
+
+        timestamp = data["timestamp"][keep].astype(np.int64)
+        seq = data["seq"][keep].astype(np.int64)
+
+        gps = gps_df[gps_df["utc_usec"] > 0]
+        boot = gps["timestamp"].to_numpy(dtype=np.int64)
+
+        if len(boot):
+            offset = gps["utc_usec"].to_numpy(dtype=np.int64) - boot
+            utc = timestamp + np.interp(timestamp, boot, offset).astype(np.int64)
+        else:
+            utc = np.zeros(len(timestamp), dtype=np.int64)
+
+        order = np.argsort(timestamp, kind="stable")
+
+        if log_callback:
+            log_callback(f"📸 {len(timestamp)} {topic} events in log.")
+
+        return pd.DataFrame({
+            "timestamp": timestamp[order],
+            "utc_usec": utc[order],
+            "seq": seq[order],
+        })
+
+    return pd.DataFrame({
+        "timestamp": np.empty(0, dtype=np.int64),
+        "utc_usec": np.empty(0, dtype=np.int64),
+        "seq": np.empty(0, dtype=np.int64),
+    })
+
+
+def merge_streams(gps_df, att_df):
+    """GPS rows with the nearest attitude sample attached."""
 
     telemetry_df = pd.merge_asof(
         gps_df,
-        att_df,
+        att_df[["timestamp", "yaw", "pitch", "roll"]],
         on="timestamp",
         direction="nearest"
     )
@@ -75,3 +190,10 @@ def extract_telemetry(ulg_path):
     telemetry_df = telemetry_df.reset_index(drop=True)
 
     return telemetry_df
+
+
+def extract_telemetry(ulg_path, topics=TELEMETRY_TOPICS, log_callback=None):
+
+    gps_df, att_df, _ = extract_streams(ulg_path, topics, log_callback)
+
+    return merge_streams(gps_df, att_df)